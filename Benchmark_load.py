@@ -0,0 +1,196 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import db_utils
+import sqlite_db
+from migrate_title_norm import insert_books
+from stage_metrics import metrics
+from order_regex import extract_order_entities as extract_order_entities_regex
+from synthetic_catalog import CATALOG_SIZES, CUSTOMER_NAMES, synthetic_books, synthetic_utterances
+
+# Benchmark tải: phát lại câu hỏi giả lập qua process_user_input, lookup_book, place_order
+# trên catalog lớn (SQLite hoặc MySQL cục bộ) với LLM giả, báo p50/p95/p99 và RPS từng stage
+STAGES = ("process_user_input", "lookup_book", "place_order")
+
+
+class StubPrompt:
+    def format(self, user_input: str) -> str:
+        return user_input
+
+
+class StubLLM:
+    """Stands in for Ollama: regex extraction as JSON after a fixed delay."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+
+    def _result(self, prompt: str):
+        order = extract_order_entities_regex(prompt)
+        text = json.dumps(order, ensure_ascii=False)
+        info = {"prompt_eval_count": len(prompt.split()), "eval_count": len(text.split())}
+        return SimpleNamespace(generations=[[SimpleNamespace(text=text, generation_info=info)]])
+
+    def generate(self, prompts: list):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result(prompts[0])
+
+    async def agenerate(self, prompts: list):
+        import asyncio
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(prompts[0])
+
+
+class StubParser:
+    def parse(self, text: str) -> dict:
+        return json.loads(text)
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    k = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+def summarize(latencies: list, wall_seconds: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": (values[-1] if values else 0.0) * 1000,
+        "rps": len(values) / wall_seconds if wall_seconds else 0.0
+    }
+
+
+def run_stage(fn, jobs: list, concurrency: int) -> dict:
+    """Run ``fn(job)`` for every job on ``concurrency`` threads, time each call."""
+    def timed(job):
+        start = time.perf_counter()
+        fn(job)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as ex:
+        latencies = list(ex.map(timed, jobs))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def prepare_backend(args) -> None:
+    if args.backend == "sqlite":
+        path = args.db_path or os.path.join(tempfile.mkdtemp(prefix="bookstore_bench_"), "bookstore.sqlite3")
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            sqlite_db.create_database(path, synthetic_books(args.books))
+            print(f"SQLite: {args.books} sách tại {path} ({time.perf_counter() - start:.1f}s)")
+        db_utils.configure_pool(connect=sqlite_db.connect_factory(path), size=args.concurrency)
+    else:
+        # MySQL: DB_CONFIG (BOOKSTORE_DB_*) phải trỏ tới một database riêng cho benchmark
+        conn = db_utils.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM books")
+        existing = cursor.fetchone()[0]
+        start = time.perf_counter()
+        batch = []
+        for row in synthetic_books(max(0, args.books - existing)):
+            batch.append(row)
+            if len(batch) == sqlite_db.INSERT_BATCH:
+                _insert_mysql(conn, batch)
+                batch = []
+        if batch:
+            _insert_mysql(conn, batch)
+        conn.close()
+        print(f"MySQL {db_utils.DB_CONFIG['database']}: {existing} sách sẵn có, "
+              f"thêm {max(0, args.books - existing)} ({time.perf_counter() - start:.1f}s)")
+        db_utils.configure_pool(size=args.concurrency)
+
+
+def _insert_mysql(conn, batch) -> None:
+    insert_books(conn.cursor(), batch)
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tải cho chatbot trên catalog giả lập")
+    parser.add_argument("--books", type=int, default=CATALOG_SIZES[0],
+                        help=f"số sách, ví dụ {', '.join(map(str, CATALOG_SIZES))}")
+    parser.add_argument("--turns", type=int, default=2000, help="số câu phát lại mỗi stage")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--db-path", help="file SQLite dùng lại giữa các lần chạy")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="độ trễ giả của LLM")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--json", help="ghi kết quả ra file JSON")
+    args = parser.parse_args()
+
+    prepare_backend(args)
+
+    import Chatbot_demo
+    Chatbot_demo.entity_prompt = StubPrompt()
+    Chatbot_demo.llm = StubLLM(args.llm_latency_ms)
+    Chatbot_demo.output_parser = StubParser()
+
+    start = time.perf_counter()
+    Chatbot_demo.catalog_index.ensure_loaded()
+    report = {"catalog_load_seconds": time.perf_counter() - start, "books": args.books,
+              "backend": args.backend, "concurrency": args.concurrency, "stages": {}}
+
+    titles = [row[1] for row in Chatbot_demo.catalog_index.rows()]
+    utterances = list(synthetic_utterances(titles, args.turns))
+    rng = random.Random(11)
+    stages = [s for s in args.stages.split(",") if s in STAGES]
+
+    # Bật span theo bước (regex, embedding, LLM, DB, fuzzy...) để biết thời gian nằm ở đâu
+    metrics.enabled = True
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        for stage in stages:
+            metrics.reset()
+            if stage == "process_user_input":
+                # Mỗi câu đặt hàng đi kèm một lượt trả lời tên trong cùng phiên,
+                # latency tính cho cả hội thoại (2 lượt)
+                def turn(job):
+                    i, u = job
+                    session_id = f"bench-{i}"
+                    Chatbot_demo.process_user_input(u["text"], session_id)
+                    if u["label"] == "place_order":
+                        Chatbot_demo.process_user_input(rng.choice(CUSTOMER_NAMES), session_id)
+                result = run_stage(turn, list(enumerate(utterances)), args.concurrency)
+            elif stage == "lookup_book":
+                result = run_stage(lambda u: Chatbot_demo.lookup_book(Chatbot_demo.extract_book_title(u["text"])),
+                                   [u for u in utterances if u["label"] == "detail_book"], args.concurrency)
+            else:
+                orders = [extract_order_entities_regex(u["text"]) for u in utterances
+                          if u["label"] == "place_order"]
+                result = run_stage(lambda o: Chatbot_demo.place_order(o, rng.choice(CUSTOMER_NAMES)),
+                                   orders, args.concurrency)
+            result["spans"] = metrics.to_dict()
+            report["stages"][stage] = result
+
+    report["pool"] = db_utils.pool_stats()
+    print(f"{args.books} sách ({args.backend}), nạp catalog {report['catalog_load_seconds']:.2f}s, "
+          f"{args.concurrency} luồng")
+    print(f"{'stage':<20}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'rps':>10}")
+    for stage, r in report["stages"].items():
+        print(f"{stage:<20}{r['count']:>7}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}{r['rps']:>10.1f}")
+        for name, h in r["spans"].items():
+            print(f"  {name:<18}{h['count']:>7}{h['mean_ms']:>10.2f} ms trung bình, tổng {h['sum_seconds']:.2f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
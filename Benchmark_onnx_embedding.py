@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# So sánh MiniLM PyTorch (float) với ONNX int8 trên val_router_1.csv:
+# độ khớp intent sau XGBoost, cosine giữa hai vector, latency và RSS của từng backend
+BACKENDS = ("torch", "onnx-int8")
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+def load_backend(name: str):
+    if name == "onnx-int8":
+        from onnx_embedder import OnnxEmbedder
+        return OnnxEmbedder(quantized=True)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME)
+
+
+def read_val(path: str) -> tuple:
+    import pandas as pd
+    df = pd.read_csv(path)
+    return df["text"].tolist(), [x.strip() for x in df["label"]]
+
+
+def measure(name: str, val_path: str, repeat: int) -> dict:
+    """Load + latency + RSS of one backend; run in a fresh process for a clean RSS."""
+    import numpy as np
+    import psutil
+
+    proc = psutil.Process()
+    rss_before = proc.memory_info().rss
+    start = time.perf_counter()
+    model = load_backend(name)
+    load_seconds = time.perf_counter() - start
+
+    texts, _ = read_val(val_path)
+    model.encode(texts[:8])  # warm-up
+    single = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        model.encode([texts[i % len(texts)]])
+        single.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    model.encode(texts, batch_size=64)
+    batch = (time.perf_counter() - start) / len(texts)
+
+    return {
+        "backend": name,
+        "load_seconds": load_seconds,
+        "single_ms_p50": float(np.median(single)) * 1000,
+        "single_ms_p95": float(np.percentile(single, 95)) * 1000,
+        "batch_ms_per_text": batch * 1000,
+        "rss_mb": proc.memory_info().rss / 2 ** 20,
+        "rss_delta_mb": (proc.memory_info().rss - rss_before) / 2 ** 20
+    }
+
+
+def agreement(val_path: str) -> dict:
+    import joblib
+    import numpy as np
+
+    texts, labels = read_val(val_path)
+    clf = joblib.load("model/model_xgb_1.pkl")
+    le = joblib.load("model/label_encoder_1.pkl")
+    vectors, intents = {}, {}
+    for name in BACKENDS:
+        vectors[name] = load_backend(name).encode(texts, batch_size=64)
+        intents[name] = le.inverse_transform(clf.predict(vectors[name]))
+
+    a, b = vectors["torch"], vectors["onnx-int8"]
+    cos = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    labels = np.array(labels)
+    return {
+        "texts": len(texts),
+        "intent_agreement": float((intents["torch"] == intents["onnx-int8"]).mean()),
+        "accuracy_torch": float((intents["torch"] == labels).mean()),
+        "accuracy_onnx_int8": float((intents["onnx-int8"] == labels).mean()),
+        "cosine_mean": float(cos.mean()),
+        "cosine_min": float(cos.min())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MiniLM float và ONNX int8")
+    parser.add_argument("--val", default="val_router_1.csv")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--measure", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.val, args.repeat)))
+        return
+
+    result = agreement(args.val)
+    print(f"{result['texts']} câu: intent khớp {result['intent_agreement']:.2%}, "
+          f"accuracy torch {result['accuracy_torch']:.4f} / onnx-int8 {result['accuracy_onnx_int8']:.4f}, "
+          f"cosine trung bình {result['cosine_mean']:.4f} (thấp nhất {result['cosine_min']:.4f})")
+
+    print(f"{'backend':<12}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'batch ms':>10}{'RSS MB':>9}{'+MB':>8}")
+    for name in BACKENDS:
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", name,
+                              "--val", args.val, "--repeat", str(args.repeat)],
+                             capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{name:<12}{r['load_seconds']:>8.2f}{r['single_ms_p50']:>9.2f}{r['single_ms_p95']:>9.2f}"
+              f"{r['batch_ms_per_text']:>10.3f}{r['rss_mb']:>9.0f}{r['rss_delta_mb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
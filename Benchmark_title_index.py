@@ -0,0 +1,95 @@
+import argparse
+import time
+
+from db_utils import get_connection
+from migrate_title_norm import apply_schema, existing_schema
+from synthetic_catalog import synthetic_books
+from text_normalize import fold_title
+
+# So sánh query plan và thời gian của các cách tìm theo tên trên catalog giả lập lớn
+BENCH_TABLE = "books_bench"
+INSERT_BATCH = 10000
+
+
+def create_bench_table(conn, rows: int) -> None:
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    cursor.execute(f"CREATE TABLE {BENCH_TABLE} LIKE books")
+    columns, indexes = existing_schema(cursor, BENCH_TABLE)
+    if "title_norm" not in columns:
+        cursor.execute(f"ALTER TABLE {BENCH_TABLE} ADD COLUMN title_norm varchar(255) NOT NULL DEFAULT '' AFTER title")
+    for index in ("idx_books_title_norm", "ft_books_title"):
+        if index in indexes:
+            cursor.execute(f"DROP INDEX {index} ON {BENCH_TABLE}")
+    batch = []
+    for title, author, price, stock, category in synthetic_books(rows):
+        batch.append((title, fold_title(title), author, price, stock, category))
+        if len(batch) == INSERT_BATCH:
+            _insert(conn, batch)
+            batch = []
+    if batch:
+        _insert(conn, batch)
+
+
+def _insert(conn, batch) -> None:
+    cursor = conn.cursor()
+    cursor.executemany(
+        f"INSERT INTO {BENCH_TABLE} (title, title_norm, author, price, stock, category) "
+        f"VALUES (%s, %s, %s, %s, %s, %s)", batch
+    )
+    conn.commit()
+
+
+def explain_and_time(conn, label: str, query: str, params: tuple, repeat: int = 5) -> None:
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("EXPLAIN " + query, params)
+    plan = cursor.fetchall()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cursor.execute(query, params)
+        found = len(cursor.fetchall())
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"\n{label}: {elapsed * 1000:.1f} ms/query, {found} dòng")
+    for step in plan:
+        print(f"  type={step['type']} key={step['key']} rows={step['rows']} extra={step['Extra']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark index tìm theo tên sách")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--query", default="Naruto tập 20")
+    parser.add_argument("--keep", action="store_true", help="giữ lại bảng benchmark")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        # books_bench copy cấu trúc của books; index trên title_norm/title được gỡ để đo bản quét toàn bảng
+        start = time.perf_counter()
+        create_bench_table(conn, args.rows)
+        print(f"Đã tạo {args.rows} dòng trong {time.perf_counter() - start:.1f}s")
+
+        q = args.query
+        folded = fold_title(q)
+        like = f"SELECT book_id, title FROM {BENCH_TABLE} WHERE title LIKE %s LIMIT 20"
+        lower_like = f"SELECT book_id, title FROM {BENCH_TABLE} WHERE LOWER(title) LIKE %s LIMIT 20"
+        prefix = f"SELECT book_id, title FROM {BENCH_TABLE} WHERE title_norm LIKE %s ORDER BY title_norm LIMIT 20"
+        fulltext = (f"SELECT book_id, title FROM {BENCH_TABLE} "
+                    f"WHERE MATCH(title) AGAINST (%s IN BOOLEAN MODE) LIMIT 20")
+
+        explain_and_time(conn, "LIKE '%x%' (không index)", like, (f"%{q}%",))
+        explain_and_time(conn, "LOWER(title) LIKE (không index)", lower_like, (f"%{q.lower()}%",))
+
+        start = time.perf_counter()
+        apply_schema(conn, BENCH_TABLE)
+        print(f"\nTạo index: {time.perf_counter() - start:.1f}s")
+
+        explain_and_time(conn, "title_norm LIKE 'x%' (prefix index)", prefix, (f"{folded}%",))
+        explain_and_time(conn, "MATCH AGAINST (FULLTEXT ngram)", fulltext, (f'"{q}"',))
+    finally:
+        if not args.keep:
+            conn.cursor().execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,160 @@
-import mysql.connector
-import joblib
-from sentence_transformers import SentenceTransformer
-from langchain.prompts import PromptTemplate
-from langchain.output_parsers import StructuredOutputParser, ResponseSchema
-from langchain_community.llms import Ollama
-from fuzzywuzzy import process
+from db_utils import get_connection, run_in_transaction
+from catalog_index import CatalogIndex
+from text_normalize import clean_text, fold_title
+from catalog_cache import CatalogCache
+from title_lookup import TitleLookup, MAX_RESULTS
+from semantic_search import SemanticIndex, EMBEDDINGS_PATH
+from hybrid_ranker import HybridRanker
+from micro_batch import MicroBatcher
+from embedding_cache import EmbeddingCache
+from extraction_cache import ExtractionCache
+from order_regex import extract_order_entities as extract_order_entities_regex
+from session_store import create_session_store
+from linear_head import LinearHead, LINEAR_HEAD_PATH
+from lazy_loader import LazyResource, warm_up, format_startup_report
+from stage_metrics import metrics, span, span_iter, span_aiter
 import re
 import json
+import atexit
+import asyncio
+import threading
+import time
+import hashlib
 
 
-embed_model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
-clf = joblib.load("model/model_xgb_1.pkl")
-label_encoder = joblib.load("model/label_encoder_1.pkl")
+# "torch": SentenceTransformer gốc; "onnx-int8": MiniLM lượng tử hóa int8 qua onnxruntime
+# (onnx_embedder.py, kiểm tra độ khớp bằng Benchmark_onnx_embedding.py)
+EMBED_BACKEND = "torch"
+
+
+def _load_embed_model():
+    if EMBED_BACKEND == "onnx-int8":
+        from onnx_embedder import OnnxEmbedder
+        return OnnxEmbedder(quantized=True)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
+
+
+# Model chỉ được nạp khi dùng lần đầu (regex hoặc luồng DB không cần model)
+embed_model = LazyResource("embed_model", _load_embed_model)
+
+def _load_pickle(path: str):
+    import joblib  # chỉ nhánh XGBoost cần, nạp cùng model
+    return joblib.load(path)
+
+
+# "xgb": model_xgb_1.pkl + label_encoder_1.pkl; "linear": head NumPy nạp bằng mmap
+# (Create_model.py --head linear, so sánh bằng Compare_intent_heads.py)
+INTENT_HEAD = "xgb"
+if INTENT_HEAD == "linear":
+    clf = LazyResource("clf", lambda: LinearHead.load(LINEAR_HEAD_PATH))
+    label_encoder = clf  # LinearHead tự map chỉ số -> nhãn
+else:
+    clf = LazyResource("clf", lambda: _load_pickle("model/model_xgb_1.pkl"))
+    label_encoder = LazyResource("label_encoder", lambda: _load_pickle("model/label_encoder_1.pkl"))
+
+
+# Rule-based ưu tiên, chỉ nhận diện place_order khi có từ khóa hành động
+ORDER_KEYWORDS = re.compile(r"(mua|đặt|giao|ship|lấy|đơn hàng|nhận|gửi|tới|đến|sdt|phone|đt|địa chỉ)", re.IGNORECASE)
+DETAIL_KEYWORDS = re.compile(r"(giá|tác giả|thể loại|xuất bản|nội dung|còn không|thông tin|bao nhiêu|còn|stock|cuốn|quyển|bản|ai)", re.IGNORECASE)
+
+
+def rule_based_intent(user_input: str):
+    with span("regex_routing"):
+        if ORDER_KEYWORDS.search(user_input):
+            return "place_order"
+        if DETAIL_KEYWORDS.search(user_input):
+            return "detail_book"
+        return None
+
+
+# Cache embedding + intent theo câu đã chuẩn hóa; đặt đường dẫn để lưu qua các lần chạy
+EMBEDDING_CACHE_SIZE = 10000
+EMBEDDING_CACHE_PATH = None  # ví dụ "model/embedding_cache.pkl"
+embedding_cache = EmbeddingCache(max_size=EMBEDDING_CACHE_SIZE, path=EMBEDDING_CACHE_PATH)
+if EMBEDDING_CACHE_PATH:
+    atexit.register(embedding_cache.save)
+
+
+def _predict_intents(texts: list) -> list:
+    # Encode + predict một lần cho cả batch, rồi ghi vào cache
+    with span("embedding"):
+        emb = embed_model.encode(texts, batch_size=64)
+    with span("xgboost_predict"):
+        intents = list(label_encoder.inverse_transform(clf.predict(emb)))
+    for text, vec, intent in zip(texts, emb, intents):
+        embedding_cache.put(text, vec, intent)
+    return intents
+
+
+def classify_intents(texts: list) -> list:
+    # Regex trước, rồi cache, các câu còn lại mới chạy model
+    intents = [rule_based_intent(t) for t in texts]
+    misses = []
+    for i, intent in enumerate(intents):
+        if intent is None:
+            cached = embedding_cache.get(texts[i])
+            if cached is not None:
+                intents[i] = cached[1]
+            else:
+                misses.append(i)
+    if misses:
+        for i, intent in zip(misses, _predict_intents([texts[i] for i in misses])):
+            intents[i] = intent
+    return intents
+
+
+# Gom các request đồng thời trong vài ms thành một batch encode/predict
+intent_batcher = MicroBatcher(_predict_intents, max_batch_size=32, max_wait_ms=5)
 
 
 def classify_intent(user_input: str) -> str:
-    # Rule-based ưu tiên, chỉ nhận diện place_order khi có từ khóa hành động
-    order_keywords = r"(mua|đặt|giao|ship|lấy|đơn hàng|nhận|gửi|tới|đến|sdt|phone|đt|địa chỉ)"
-    detail_keywords = r"(giá|tác giả|thể loại|xuất bản|nội dung|còn không|thông tin|bao nhiêu|còn|stock|cuốn|quyển|bản|ai)"
-    if re.search(order_keywords, user_input, re.IGNORECASE):
-        return "place_order"
-    if re.search(detail_keywords, user_input, re.IGNORECASE):
-        return "detail_book"
-
-    emb = embed_model.encode([user_input])
-    pred_label = clf.predict(emb)[0]
-    intent = label_encoder.inverse_transform([pred_label])[0]
-    return intent
+    intent = rule_based_intent(user_input)
+    if intent is not None:
+        return intent
+    cached = embedding_cache.get(user_input)
+    if cached is not None:
+        return cached[1]
+    return intent_batcher(user_input)
+
+
+async def classify_intent_async(user_input: str) -> str:
+    intent = rule_based_intent(user_input)
+    if intent is not None:
+        return intent
+    cached = embedding_cache.get(user_input)
+    if cached is not None:
+        return cached[1]
+    # Model chạy trên thread của batcher, event loop chỉ chờ future
+    return await asyncio.wrap_future(intent_batcher.submit(user_input))
 
 def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="17101975",
-        database="bookstore"
-    )
+    # Mượn kết nối từ pool dùng chung (db_utils); conn.close() trả lại pool
+    return get_connection()
+
+
+# Index tên sách trong bộ nhớ, nạp một lần rồi refresh tăng dần
+catalog_index = CatalogIndex(get_db_connection)
+# Cache đọc-qua theo book_id cho câu trả lời chi tiết; tồn kho đọc lại sau STOCK_TTL giây
+catalog_cache = CatalogCache(get_db_connection)
+# Chọn cách tìm theo tên dựa trên index có trong bảng books (xem mySQL_DB_file/migrations)
+title_lookup = TitleLookup(get_db_connection)
+# Tìm kiếm ngữ nghĩa theo tên/tác giả/thể loại, dùng lại embed_model
+# Vector của mỗi backend embedding hơi khác nhau nên lưu file riêng
+semantic_index = SemanticIndex(embed_model, catalog_index,
+                               EMBEDDINGS_PATH if EMBED_BACKEND == "torch"
+                               else f"model/book_embeddings_{EMBED_BACKEND}.npy")
+
+# Xếp hạng một lượt theo BM25 + fuzzy (+ embedding khi HYBRID_USE_SEMANTIC)
+HYBRID_USE_SEMANTIC = False
+hybrid_ranker = HybridRanker(catalog_index, semantic=semantic_index if HYBRID_USE_SEMANTIC else None)
+
+# "like": LIKE + fuzzy, "semantic": top-k theo embedding, "hybrid": HybridRanker
+LOOKUP_MODE = "like"
+SEMANTIC_TOP_K = 5
+SEMANTIC_MIN_SCORE = 0.35
+HYBRID_TOP_K = 5
+HYBRID_MIN_SCORE = 0.6  # điểm tổng hợp trong [0, 1]
 
 
 def extract_book_title(user_input: str) -> str:
@@ -45,35 +165,82 @@ def extract_book_title(user_input: str) -> str:
         return m.group(1).strip()
     return user_input.strip()
 
-def lookup_book(book_title: str) -> str:
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _with_fresh_rows(scored: list) -> list:
+    # Dòng trong CatalogIndex không được đọc lại tồn kho; lấy qua catalog_cache (theo TTL)
+    fresh = {r[0]: r for r in catalog_cache.get_many([r[0] for r, _ in scored])}
+    return [(fresh[r[0]], score) for r, score in scored if r[0] in fresh]
 
-    query = "SELECT title, author, price, stock, category FROM books WHERE title LIKE %s"
-    cursor.execute(query, (f"%{book_title}%",))
-    results = cursor.fetchall()
-
-    if not results:
-        cursor.execute("SELECT title, author, price, stock, category FROM books")
-        all_books = cursor.fetchall()
-        titles = [r[0] for r in all_books]
-
-        best_match, score = process.extractOne(book_title, titles)
-        if score >= 85:  # ngưỡng độ chính xác
-            for r in all_books:
-                if r[0] == best_match:
-                    results = [r]
-                    break
-
-    conn.close()
-
-    if results:
-        resp = []
-        for r in results:
-            resp.append(f"{r[0]} của {r[1]}, giá {r[2]}, còn {r[3]} quyển, thể loại {r[4]}")
-        return "\n".join(resp)
-    else:
+
+def semantic_lookup(book_title: str, k: int = SEMANTIC_TOP_K) -> str:
+    matches = [(r, score) for r, score in semantic_index.search(book_title, k=k)
+               if score >= SEMANTIC_MIN_SCORE]
+    matches = _with_fresh_rows(matches)
+    if not matches:
         return f"Không tìm thấy sách '{book_title}'."
+    resp = []
+    for r, score in matches:
+        resp.append(f"{r[1]} của {r[2]}, giá {r[3]}, còn {r[4]} quyển, thể loại {r[5]} (độ phù hợp {score:.2f})")
+    return "\n".join(resp)
+
+
+def hybrid_lookup(book_title: str, k: int = HYBRID_TOP_K) -> str:
+    with span("fuzzy_match"):
+        ranked = [(r, score) for r, score, _ in hybrid_ranker.rank(book_title, k=k)
+                  if score >= HYBRID_MIN_SCORE]
+    with span("db_query"):
+        ranked = _with_fresh_rows(ranked)
+    with span("response_formatting"):
+        if not ranked:
+            return f"Không tìm thấy sách '{book_title}'."
+        return "\n".join(f"{r[1]} của {r[2]}, giá {r[3]}, còn {r[4]} quyển, thể loại {r[5]}"
+                         for r, _ in ranked)
+
+
+def _lookup_in_index(key: str) -> list:
+    # Tên có trong index (chuỗi con) -> các dòng khớp; không thì sách gần đúng nhất.
+    # Dòng lấy qua catalog_cache, không cần hỏi DB khi tồn kho còn mới
+    ids = catalog_index.containing(key, limit=MAX_RESULTS)
+    if not ids:
+        with span("fuzzy_match"):
+            match = catalog_index.best_match(key, threshold=85)  # ngưỡng độ chính xác
+        ids = [match[0]] if match else []
+    with span("db_query"):
+        return catalog_cache.get_many(ids)
+
+
+def lookup_book(book_title: str, mode: str = "like") -> str:
+    if mode == "semantic":
+        return semantic_lookup(book_title)
+    if mode == "hybrid":
+        return hybrid_lookup(book_title)
+
+    # Khóa bỏ dấu tính một lần, dùng lại cho index, fuzzy và cache
+    key = fold_title(book_title)
+    rows = _lookup_in_index(key)
+    if not rows and catalog_index.refresh():
+        # Có thể là sách mới thêm: kéo sách mới về index (theo book_id) rồi thử lại
+        rows = _lookup_in_index(key)
+    if not rows:
+        # Index và fuzzy đều trượt mới hỏi DB: prefix title_norm, FULLTEXT ngram, rồi tới LIKE
+        with span("db_query"):
+            conn = get_db_connection()
+            try:
+                rows = title_lookup.find(conn.cursor(), book_title,
+                                         "book_id, title, author, price, stock, category")
+            finally:
+                conn.close()
+        catalog_index.upsert(rows)
+        catalog_cache.put(rows)
+    results = [r[1:] for r in rows]
+
+    with span("response_formatting"):
+        if results:
+            resp = []
+            for r in results:
+                resp.append(f"{r[0]} của {r[1]}, giá {r[2]}, còn {r[3]} quyển, thể loại {r[4]}")
+            return "\n".join(resp)
+        else:
+            return f"Không tìm thấy sách '{book_title}'."
 
 
 # llm = Ollama(model="llama3.2:1b")
@@ -88,69 +255,111 @@ def lookup_book(book_title: str) -> str:
 # )
 # chain = entity_prompt | llm
 #___________________________________________________________
-# 1. Định nghĩa schema cho JSON
-response_schemas = [
-    ResponseSchema(name="book_title", description="Tên sách mà khách muốn mua"),
-    ResponseSchema(name="quantity", description="Số lượng sách cần mua, là số nguyên"),
-    ResponseSchema(name="address", description="Địa chỉ giao hàng của khách"),
-    ResponseSchema(name="phone", description="Số điện thoại của khách hàng")
-]
-
-# 2. Tạo parser
-output_parser = StructuredOutputParser.from_response_schemas(response_schemas)
-
-# Lấy format hướng dẫn cho LLM (ví dụ JSON mẫu)
-format_instructions = output_parser.get_format_instructions()
-
-# 3. Prompt template
-entity_prompt = PromptTemplate(
-    template="""
+# 1. Định nghĩa schema cho JSON và tạo parser
+def _build_output_parser():
+    from langchain.output_parsers import StructuredOutputParser, ResponseSchema
+    response_schemas = [
+        ResponseSchema(name="book_title", description="Tên sách mà khách muốn mua"),
+        ResponseSchema(name="quantity", description="Số lượng sách cần mua, là số nguyên"),
+        ResponseSchema(name="items", type="array",
+                       description="Mọi sách khách muốn mua, mỗi phần tử là object có book_title và quantity"),
+        ResponseSchema(name="address", description="Địa chỉ giao hàng của khách"),
+        ResponseSchema(name="phone", description="Số điện thoại của khách hàng")
+    ]
+    return StructuredOutputParser.from_response_schemas(response_schemas)
+
+
+# 2. Prompt template
+ENTITY_TEMPLATE = """
 Bạn là extractor cho chatbot BookStore.
 Hãy phân tích câu sau và xuất ra JSON theo đúng định dạng.
 
 ⚠️ Chỉ trả về một JSON object duy nhất, KHÔNG dùng markdown, KHÔNG bọc trong [].
 - "book_title": chỉ chứa tên sách
 - "quantity": chỉ chứa số nguyên
+- "items": danh sách mọi sách khách muốn mua, mỗi phần tử {{"book_title": ..., "quantity": ...}};
+  "book_title"/"quantity" ở trên là của sách đầu tiên
 - "address": chỉ chứa mỗi địa chỉ, không được có "Địa chỉ giao hàng:", không có số điện thoại
 - "phone": chỉ chứa số điện thoại (chỉ số, không chữ)
 
 Câu: {user_input}
 
 {format_instructions}
-""",
-    input_variables=["user_input"],
-    partial_variables={"format_instructions": format_instructions}
-)
-
-# 4. LLM model
-llm = Ollama(model="llama3.2:1b")
-
-# 5. Tạo chain
-chain = entity_prompt | llm | output_parser
-
-VIETNAMESE_NUMBERS = {
-    "một": 1, "mốt": 1,
-    "hai": 2,
-    "ba": 3,
-    "bốn": 4, "tư": 4,
-    "năm": 5, "lăm": 5,
-    "sáu": 6,
-    "bảy": 7,
-    "tám": 8,
-    "chín": 9,
-    "mười": 10
+"""
+
+
+def _build_entity_prompt():
+    from langchain.prompts import PromptTemplate
+    # Lấy format hướng dẫn cho LLM (ví dụ JSON mẫu)
+    return PromptTemplate(
+        template=ENTITY_TEMPLATE,
+        input_variables=["user_input"],
+        partial_variables={"format_instructions": output_parser.get_format_instructions()}
+    )
+
+
+# 3. LLM model
+def _build_llm():
+    from langchain_community.llms import Ollama
+    return Ollama(model=LLM_MODEL_NAME)
+
+
+# Parser, prompt và LLM đều tạo lười khi trích xuất đơn hàng lần đầu
+output_parser = LazyResource("output_parser", _build_output_parser)
+entity_prompt = LazyResource("entity_prompt", _build_entity_prompt)
+llm = LazyResource("llm", _build_llm)
+
+# 4. Cache kết quả trích xuất: key = phiên bản prompt + câu đã chuẩn hóa.
+# Sửa ENTITY_TEMPLATE hoặc đổi model sẽ tự đổi phiên bản, cache cũ không còn dùng.
+LLM_MODEL_NAME = "llama3.2:1b"
+PROMPT_VERSION = hashlib.sha1((LLM_MODEL_NAME + ENTITY_TEMPLATE).encode("utf-8")).hexdigest()[:12]
+EXTRACTION_CACHE_SIZE = 5000
+EXTRACTION_CACHE_TTL = 7 * 24 * 3600
+EXTRACTION_CACHE_PATH = None  # ví dụ "model/extraction_cache.sqlite3"
+extraction_cache = ExtractionCache(max_size=EXTRACTION_CACHE_SIZE, ttl=EXTRACTION_CACHE_TTL,
+                                   path=EXTRACTION_CACHE_PATH)
+
+# Thời gian và số token của mỗi lần LLM trích xuất
+extraction_stats = {
+    "calls": 0,
+    "seconds_total": 0.0,
+    "seconds_max": 0.0,
+    "prompt_tokens": 0,
+    "completion_tokens": 0,
+    "streamed_calls": 0,
+    "first_token_seconds_total": 0.0,
+    "first_token_seconds_max": 0.0
 }
-def normalize_quantity(text: str) -> int:
-    m = re.search(r'(\d+)\s*(?:cuốn|quyển|bản)', text, re.IGNORECASE)
-    if m:
-        return int(m.group(1))
+_extraction_stats_lock = threading.Lock()
+
 
+def _add_extraction_stats(seconds: float, prompt_tokens: int, completion_tokens: int) -> None:
+    with _extraction_stats_lock:
+        extraction_stats["calls"] += 1
+        extraction_stats["seconds_total"] += seconds
+        extraction_stats["seconds_max"] = max(extraction_stats["seconds_max"], seconds)
+        extraction_stats["prompt_tokens"] += prompt_tokens
+        extraction_stats["completion_tokens"] += completion_tokens
+    print(f"LLM extraction: {seconds:.2f}s, {prompt_tokens} prompt tokens, {completion_tokens} completion tokens")
 
-    for word, num in VIETNAMESE_NUMBERS.items():
-        if re.search(rf'{word}\s*(?:cuốn|quyển|bản)', text, re.IGNORECASE):
-            return num
 
-    return 1
+def _record_extraction(result, seconds: float) -> str:
+    # Ollama trả số token trong generation_info (prompt_eval_count / eval_count)
+    generation = result.generations[0][0]
+    info = generation.generation_info or {}
+    _add_extraction_stats(seconds, info.get("prompt_eval_count") or 0, info.get("eval_count") or 0)
+    return generation.text
+
+
+def _record_stream(seconds: float, first_token: float, chunks: int) -> None:
+    # Khi stream, Ollama gửi mỗi token một chunk; không có số token của prompt
+    _add_extraction_stats(seconds, 0, chunks)
+    with _extraction_stats_lock:
+        extraction_stats["streamed_calls"] += 1
+        extraction_stats["first_token_seconds_total"] += first_token
+        extraction_stats["first_token_seconds_max"] = max(extraction_stats["first_token_seconds_max"], first_token)
+    if metrics.enabled:
+        metrics.observe("llm_first_token", first_token)
 
 
 def extract_order_entities(user_input: str) -> dict:
@@ -171,70 +380,120 @@ def extract_order_entities(user_input: str) -> dict:
     #
     # except Exception as e:
     #     print("LLM parse fail:", e, "| Input:", user_input)
+    cached = extraction_cache.get(PROMPT_VERSION, user_input)
+    if cached is not None:
+        return cached
     try:
-        raw_output = llm.invoke(entity_prompt.format(user_input=user_input))
-        print("LLM raw output:", raw_output)
-
-        order = chain.invoke({"user_input": user_input})
-        # Normalize giá trị
-        order["book_title"] = order.get("book_title", "").strip().rstrip(",. ")
-        order["quantity"] = int(order.get("quantity", 1)) if order.get("quantity") else 1
-        order["address"] = order.get("address", "Unknown").strip().rstrip(",. ")
-        order["phone"] = order.get("phone", "Unknown").strip().rstrip(",. ")
-        return order
+        # Gọi LLM một lần duy nhất, giữ raw text để log rồi parse bằng output_parser
+        prompt = entity_prompt.format(user_input=user_input)
+        start = time.perf_counter()
+        with span("llm_extraction"):
+            result = llm.generate([prompt])
+        raw_output = _record_extraction(result, time.perf_counter() - start)
+        return _parse_extraction(user_input, raw_output)
     except Exception as e:
         print("LLM parse fail:", e, "| Input:", user_input)
-        phone_match = re.search(
-            r'(?:số điện thoại|đt|phone)?[:\s]*([\d\s-]{5,15})',
-            user_input,
-            re.IGNORECASE
-        )
-        phone = re.sub(r'[\s-]', '', phone_match.group(1)) if phone_match else "Unknown"
+        return extract_order_entities_regex(user_input)
 
-        temp_input = re.sub(
-            r'(?:số điện thoại|đt|phone)?[:\s]*([\d\s-]{8,15})',
-            '',
-            user_input,
-            flags=re.IGNORECASE
-        )
 
-        addr_match = re.search(
-            r'(?:tới|đến|địa chỉ|giao|về|ở)\s+(.+?)(?=\s*(?:số điện thoại|đt|phone|,|$))',
-            temp_input,
-            re.IGNORECASE
-        )
-        address = addr_match.group(1).strip() if addr_match else "Unknown"
-        if address != "Unknown":
-        # Xóa từ khóa nếu còn sót
-            address = re.sub(r'^(tới|đến|địa chỉ|giao|về|ở)\s+', '', address, flags=re.IGNORECASE)
-        # Xóa dấu câu thừa
-            address = re.sub(r'[\s,\.]+$', '', address)
-
-
-        # qty_match = re.search(r'(\d+)\s*(?:cuốn|quyển|bản)?', temp_input, re.IGNORECASE)
-        # quantity = int(qty_match.group(1)) if qty_match else 1
-
-        quantity = normalize_quantity(temp_input)
-        temp_input = re.sub(
-            r'\b(cho|tôi|muốn|mua|đặt|giao|lấy|cuốn|quyển|bản)\b',
-            '',
-            temp_input,
-            flags=re.IGNORECASE
-        ).strip()
-
-        book_match = re.search(
-            r'(?:mua|đặt|tôi muốn đặt|tôi muốn mua)?\s*(?:một|hai|ba|\d+)?\s*(?:cuốn|quyển|bản)?\s*([^\d,\.]+?)(?=\s*(?:tới|đến|địa chỉ|ở|sdt|phone|,|$))',
-            temp_input,
-            re.IGNORECASE
-        )
-        book_title = book_match.group(1).strip() if book_match else "Unknown"
+async def extract_order_entities_async(user_input: str) -> dict:
+    # Giống extract_order_entities nhưng gọi LLM bất đồng bộ (ainvoke)
+    cached = extraction_cache.get(PROMPT_VERSION, user_input)
+    if cached is not None:
+        return cached
+    try:
+        prompt = entity_prompt.format(user_input=user_input)
+        start = time.perf_counter()
+        with span("llm_extraction"):
+            result = await llm.agenerate([prompt])
+        raw_output = _record_extraction(result, time.perf_counter() - start)
+        return _parse_extraction(user_input, raw_output)
+    except Exception as e:
+        print("LLM parse fail:", e, "| Input:", user_input)
+        return extract_order_entities_regex(user_input)
+
+
+def _parse_extraction(user_input: str, raw_output: str) -> dict:
+    print("LLM raw output:", raw_output)
+    order = normalize_order(output_parser.parse(raw_output))
+    extraction_cache.put(PROMPT_VERSION, user_input, order)
+    return order
+
+
+def stream_order_entities(user_input: str):
+    # Giống extract_order_entities nhưng yield ("token", text) ngay khi LLM sinh ra,
+    # cuối cùng là ("order", dict) đã parse (hoặc từ cache / regex khi lỗi)
+    cached = extraction_cache.get(PROMPT_VERSION, user_input)
+    if cached is not None:
+        yield "order", cached
+        return
+    try:
+        prompt = entity_prompt.format(user_input=user_input)
+        raw_output, chunks, first_token = "", 0, None
+        start = time.perf_counter()
+        # span_iter chỉ tính thời gian chờ LLM, không tính lúc UI xử lý token đã yield
+        for chunk in span_iter("llm_extraction", llm.stream(prompt)):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            raw_output += chunk
+            chunks += 1
+            yield "token", chunk
+        _record_stream(time.perf_counter() - start, first_token or 0.0, chunks)
+        order = _parse_extraction(user_input, raw_output)
+    except Exception as e:
+        print("LLM parse fail:", e, "| Input:", user_input)
+        order = extract_order_entities_regex(user_input)
+    yield "order", order
+
+
+async def stream_order_entities_async(user_input: str):
+    # Bản async của stream_order_entities (llm.astream)
+    cached = extraction_cache.get(PROMPT_VERSION, user_input)
+    if cached is not None:
+        yield "order", cached
+        return
+    try:
+        prompt = entity_prompt.format(user_input=user_input)
+        raw_output, chunks, first_token = "", 0, None
+        start = time.perf_counter()
+        async for chunk in span_aiter("llm_extraction", llm.astream(prompt)):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            raw_output += chunk
+            chunks += 1
+            yield "token", chunk
+        _record_stream(time.perf_counter() - start, first_token or 0.0, chunks)
+        order = _parse_extraction(user_input, raw_output)
+    except Exception as e:
+        print("LLM parse fail:", e, "| Input:", user_input)
+        order = extract_order_entities_regex(user_input)
+    yield "order", order
+
+
+def _to_quantity(value) -> int:
+    # Chỉ thiếu mới mặc định 1: số lượng 0 phải tới place_order để bị từ chối
+    return 1 if value is None or value == "" else int(value)
+
+
+def normalize_order(order: dict) -> dict:
+    # Normalize giá trị
+    order["book_title"] = order.get("book_title", "").strip().rstrip(",. ")
+    order["quantity"] = _to_quantity(order.get("quantity"))
+    # Giỏ hàng nhiều sách; LLM đôi khi trả items là chuỗi JSON
+    items = order.get("items") or []
+    if isinstance(items, str):
+        items = json.loads(items)
+    items = [{"book_title": str(item.get("book_title", "")).strip().rstrip(",. "),
+              "quantity": _to_quantity(item.get("quantity"))}
+             for item in items if isinstance(item, dict)]
+    order["items"] = [item for item in items if item["book_title"]] or \
+        [{"book_title": order["book_title"], "quantity": order["quantity"]}]
+    order["book_title"] = order["items"][0]["book_title"]
+    order["quantity"] = order["items"][0]["quantity"]
+    order["address"] = order.get("address", "Unknown").strip().rstrip(",. ")
+    order["phone"] = order.get("phone", "Unknown").strip().rstrip(",. ")
+    return order
 
-        return {
-            "book_title": book_title,
-            "quantity": quantity,
-            "address": address,
-            "phone": phone
-        }
 
 #______________________________________________________
 
@@ -242,82 +501,316 @@ def extract_order_entities(user_input: str) -> dict:
 #________________________________________________________
 
 
-def place_order(order: dict, customer_name="Khách hàng") -> str:
-    conn = get_db_connection()
+class InsufficientStock(Exception):
+    def __init__(self, title: str, stock: int, book_id: int = None):
+        super().__init__(title, stock)
+        self.title = title
+        self.stock = stock
+        self.book_id = book_id
+
+
+def resolve_books(book_titles: list) -> list:
+    # (book_id, title, stock) của sách khớp nhất cho từng tên, hoặc None.
+    # Cả giỏ hàng: index + fuzzy trong bộ nhớ, một lần đọc cache, và chỉ một truy vấn DB
+    # cho tất cả các tên vẫn chưa khớp
+    keys = [fold_title(t) for t in book_titles]
+    ids = []
+    for key in keys:
+        book_id = next(iter(catalog_index.containing(key, limit=1)), None)
+        if book_id is None:
+            with span("fuzzy_match"):
+                match = catalog_index.best_match(key, threshold=85)  # ngưỡng confidence
+            book_id = match[0] if match else None
+        ids.append(book_id)
+    resolved = [None] * len(book_titles)
+    with span("db_query"):
+        rows = {r[0]: r for r in catalog_cache.get_many([b for b in ids if b is not None])}
+        for i, book_id in enumerate(ids):
+            if book_id in rows:
+                r = rows[book_id]
+                resolved[i] = (r[0], r[1], r[4])
+        misses = [book_titles[i] for i, res in enumerate(resolved) if res is None]
+        if misses:
+            conn = get_db_connection()
+            try:
+                found = title_lookup.find_many(conn.cursor(), misses, "book_id, title, stock")
+            finally:
+                conn.close()
+            for i, res in enumerate(resolved):
+                row = found.get(book_titles[i]) if res is None else None
+                if row:
+                    resolved[i] = tuple(row)
+                    catalog_index.update_stock(row[0], row[2])
+                    catalog_cache.set_stock(row[0], row[2])
+    return resolved
+
+
+def resolve_book(book_title: str):
+    # Trả về (book_id, title, stock) của sách khớp nhất, hoặc None
+    return resolve_books([book_title])[0]
+
+
+def _reserve_and_insert(conn, lines: list, customer_name: str, phone: str, address: str) -> None:
+    # lines: [(book_id, matched_title, quantity)]; cả giỏ thành công hoặc rollback cùng nhau
     cursor = conn.cursor()
+    needed = {}
+    for book_id, matched_title, quantity in lines:
+        title, qty = needed.get(book_id, (matched_title, 0))
+        needed[book_id] = (title, qty + quantity)
+    # Trừ kho có điều kiện theo thứ tự book_id: chỉ thành công khi còn đủ hàng,
+    # InnoDB khóa dòng tới khi commit, hai giỏ cùng sách không khóa chéo nhau
+    for book_id in sorted(needed):
+        matched_title, quantity = needed[book_id]
+        cursor.execute(
+            "UPDATE books SET stock = stock - %s WHERE book_id = %s AND stock >= %s",
+            (quantity, book_id, quantity)
+        )
+        if cursor.rowcount == 0:
+            cursor.execute("SELECT stock FROM books WHERE book_id = %s", (book_id,))
+            row = cursor.fetchone()
+            raise InsufficientStock(matched_title, row[0] if row else 0, book_id)
+    cursor.executemany("""
+        INSERT INTO orders (customer_name, phone, address, book_id, quantity, status)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, [(customer_name, phone, address, book_id, quantity, "pending")
+          for book_id, _, quantity in lines])
 
-    book_title = order['book_title'].strip().rstrip(",. ").lower()
-
-    cursor.execute(
-        "SELECT book_id, title, stock FROM books WHERE LOWER(title) LIKE %s",
-        (f"%{book_title}%",)
-    )
-    res = cursor.fetchone()
-
-    if not res:
-        cursor.execute("SELECT book_id, title, stock FROM books")
-        all_books = cursor.fetchall()  # [(book_id, title, stock), ...]
 
-        titles = [r[1] for r in all_books]
-        best_match, score = process.extractOne(book_title, titles)
+def order_items(order: dict) -> list:
+    # Đơn cũ (trước khi có giỏ hàng) chỉ có book_title/quantity
+    return order.get("items") or [{"book_title": order["book_title"], "quantity": order["quantity"]}]
 
-        if score >= 85:  # ngưỡng confidence
-            for r in all_books:
-                if r[1] == best_match:
-                    res = r
-                    break
 
-    if not res:
-        conn.close()
-        return f"Không tìm thấy sách '{order['book_title']}' để đặt."
+def describe_items(items: list) -> str:
+    return ", ".join(f"{item['quantity']} quyển '{item['book_title']}'" for item in items)
 
-    book_id, matched_title, stock = res
 
-    if order["quantity"] > stock:
-        conn.close()
-        return f"Sách '{matched_title}' chỉ còn {stock} quyển, không đủ số lượng {order['quantity']}."
+def place_order(order: dict, customer_name="Khách hàng") -> str:
+    items = order_items(order)
+    # Số lượng <= 0 sẽ làm UPDATE có điều kiện cộng ngược vào kho: loại trước khi mở transaction
+    invalid = []
+    for item in items:
+        try:
+            item["quantity"] = int(item["quantity"])
+        except (TypeError, ValueError):
+            invalid.append(item)
+            continue
+        if item["quantity"] < 1:
+            invalid.append(item)
+    if invalid:
+        return "\n".join(f"Số lượng không hợp lệ cho sách '{item['book_title']}': {item['quantity']}"
+                         for item in invalid)
+    titles = [item["book_title"].strip().rstrip(",. ") for item in items]
+
+    resolved = resolve_books(titles)
+    missing = [item["book_title"] for item, res in zip(items, resolved) if not res]
+    if missing:
+        return "\n".join(f"Không tìm thấy sách '{title}' để đặt." for title in missing)
+
+    lines = [(res[0], res[1], item["quantity"]) for item, res in zip(items, resolved)]
 
     address = order.get("address", "Unknown").strip()
     address = re.sub(r"^(địa chỉ giao hàng:|giao về)\s*", "", address, flags=re.IGNORECASE)
 
-    cursor.execute("""
-        INSERT INTO orders (customer_name, phone, address, book_id, quantity, status)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """, (customer_name, order["phone"], order["address"], book_id, order["quantity"], "pending"))
-    conn.commit()
-    conn.close()
+    # Trừ kho và ghi mọi dòng của đơn trong cùng một transaction, tự chạy lại khi deadlock
+    try:
+        with span("db_query"):
+            run_in_transaction(lambda conn: _reserve_and_insert(
+                conn, lines, customer_name, order["phone"], order["address"]
+            ))
+    except InsufficientStock as e:
+        quantity = sum(q for b, _, q in lines if b == e.book_id)
+        catalog_index.update_stock(e.book_id, e.stock)
+        catalog_cache.set_stock(e.book_id, e.stock)
+        return f"Sách '{e.title}' chỉ còn {e.stock} quyển, không đủ số lượng {quantity}."
+    for book_id, _, quantity in lines:
+        catalog_index.adjust_stock(book_id, -quantity)
+        catalog_cache.invalidate_stock(book_id)
+
+    if len(lines) == 1:
+        return f"Đơn hàng {lines[0][2]} quyển '{lines[0][1]}' đã được ghi nhận, giao tới {address}."
+    ordered = describe_items([{"book_title": title, "quantity": q} for _, title, q in lines])
+    return f"Đơn hàng gồm {ordered} đã được ghi nhận, giao tới {address}."
+
+
+
+# Đơn chờ tên khách hàng, lưu theo từng phiên (session_id) thay vì một biến toàn cục
+SESSION_BACKEND = "memory"  # hoặc "sqlite"
+SESSION_DB_PATH = "sessions.sqlite3"
+SESSION_TTL = 1800
+DEFAULT_SESSION_ID = "default"
+session_store = create_session_store(SESSION_BACKEND, path=SESSION_DB_PATH, ttl=SESSION_TTL)
+
+NAME_PREFIX_RE = re.compile(r"^(?:tôi tên là|tên tôi là|tên mình là|mình tên là|tên là|tên)\s*:?\s*", re.IGNORECASE)
+NON_NAME_RE = re.compile(r"\d|\b(?:mua|đặt|giao|ship|giá|sách|cuốn|quyển|bao nhiêu|còn|tác giả|thể loại|thông tin|địa chỉ)\b",
+                         re.IGNORECASE)
+
+
+def extract_customer_name(user_input: str):
+    # Câu trả lời tên: ngắn, không có số hay từ khóa đặt/hỏi sách
+    text = NAME_PREFIX_RE.sub("", user_input.strip()).strip(" .,!")
+    if not text or len(text.split()) > 5 or NON_NAME_RE.search(text):
+        return None
+    return text
+
+
+def _pending_prompt(order: dict, pending_count: int) -> str:
+    with span("response_formatting"):
+        result = f"Bạn vui lòng cho mình biết tên khách hàng để hoàn tất đơn {describe_items(order_items(order))}?"
+        if pending_count > 1:
+            result += f" (đang có {pending_count} đơn chờ xác nhận)"
+        return result
 
-    return f"Đơn hàng {order['quantity']} quyển '{matched_title}' đã được ghi nhận, giao tới {address}."
 
+# Đo thời gian từng bước khi BOOKSTORE_METRICS=1; histogram được ghi ra METRICS_PATH khi thoát
+METRICS_PATH = None  # ví dụ "metrics.prom" (Prometheus text) hoặc "metrics.json"
+if metrics.enabled and METRICS_PATH:
+    atexit.register(metrics.dump, METRICS_PATH)
 
 
-pending_order = None
-def process_user_input(user_input: str):
-    global pending_order
-    if pending_order is not None:
-        customer_name = user_input.strip()
-        result = place_order(pending_order, customer_name)
-        pending_order = None
-        return result
+UNKNOWN_INTENT_MESSAGE = "Không nhận diện được intent."
+# Trạng thái hiện trong lúc chờ LLM đọc đơn hàng ở chế độ stream
+EXTRACTING_MESSAGE = "Đang đọc thông tin đơn hàng..."
+
+
+# Phần dùng chung của bốn biến thể xử lý một lượt (sync/async, trả cả câu/stream)
+def _take_pending(user_input: str, session_id: str):
+    # Phiên đang chờ tên khách và câu này là tên -> (tên, các đơn chờ); không thì None
+    if session_store.get_pending(session_id):
+        customer_name = extract_customer_name(user_input)
+        if customer_name:
+            return customer_name, session_store.pop_pending(session_id)
+    return None
+
+
+def _answer_detail(user_input: str) -> str:
+    return lookup_book(extract_book_title(user_input), mode=LOOKUP_MODE)
+
+
+def _queue_order(session_id: str, order: dict) -> str:
+    pending_count = session_store.add_pending(session_id, order)
+    return _pending_prompt(order, pending_count)
+
+
+def process_user_input(user_input: str, session_id: str = DEFAULT_SESSION_ID):
+    with span("turn"):
+        return _process_turn(clean_text(user_input), session_id)
+
+
+def _process_turn(user_input: str, session_id: str):
+    pending = _take_pending(user_input, session_id)
+    if pending:
+        customer_name, orders = pending
+        return "\n".join(place_order(order, customer_name) for order in orders)
 
     intent = classify_intent(user_input)
     print(f"Intent: {intent}")
 
     if intent == "detail_book":
-        book_title = extract_book_title(user_input)
-        result = lookup_book(book_title)
-    elif intent == "place_order":
-        order = extract_order_entities(user_input)
-        pending_order = order
-        result = f"Bạn vui lòng cho mình biết tên khách hàng để hoàn tất đơn {order['quantity']} quyển '{order['book_title']}'?"
+        return _answer_detail(user_input)
+    if intent == "place_order":
+        return _queue_order(session_id, extract_order_entities(user_input))
+    return UNKNOWN_INTENT_MESSAGE
+
 
+async def process_user_input_async(user_input: str, session_id: str = DEFAULT_SESSION_ID):
+    # Bản async của process_user_input: model chạy trong executor/batcher,
+    # LLM và MySQL được await nên nhiều hội thoại có thể chạy song song
+    with span("turn"):
+        return await _process_turn_async(clean_text(user_input), session_id)
+
+
+async def _process_turn_async(user_input: str, session_id: str):
+    pending = _take_pending(user_input, session_id)
+    if pending:
+        customer_name, orders = pending
+        results = [await asyncio.to_thread(place_order, order, customer_name) for order in orders]
+        return "\n".join(results)
+
+    intent = await classify_intent_async(user_input)
+    print(f"Intent: {intent}")
+
+    if intent == "detail_book":
+        return await asyncio.to_thread(_answer_detail, user_input)
+    if intent == "place_order":
+        return _queue_order(session_id, await extract_order_entities_async(user_input))
+    return UNKNOWN_INTENT_MESSAGE
+
+
+def process_user_input_stream(user_input: str, session_id: str = DEFAULT_SESSION_ID):
+    # Giống process_user_input nhưng là generator: mỗi lần yield toàn bộ câu trả lời tới lúc đó,
+    # token của LLM được hiện ngay khi sinh ra thay vì chờ cả câu.
+    # "turn" chỉ tính thời gian xử lý, không tính lúc UI hiển thị từng phần
+    yield from span_iter("turn", _stream_turn(clean_text(user_input), session_id))
+
+
+def _stream_turn(user_input: str, session_id: str):
+    pending = _take_pending(user_input, session_id)
+    if pending:
+        customer_name, orders = pending
+        results = []
+        for order in orders:
+            results.append(place_order(order, customer_name))
+            yield "\n".join(results)
+        return
+
+    intent = classify_intent(user_input)
+    print(f"Intent: {intent}")
+
+    if intent == "detail_book":
+        yield _answer_detail(user_input)
+    elif intent == "place_order":
+        yield EXTRACTING_MESSAGE
+        raw_output = ""
+        for kind, value in stream_order_entities(user_input):
+            if kind == "token":
+                raw_output += value
+                yield f"{EXTRACTING_MESSAGE}\n{raw_output}"
+            else:
+                order = value
+        yield _queue_order(session_id, order)
     else:
-        result = "Không nhận diện được intent."
+        yield UNKNOWN_INTENT_MESSAGE
+
+
+async def process_user_input_stream_async(user_input: str, session_id: str = DEFAULT_SESSION_ID):
+    # Bản async của process_user_input_stream, dùng cho Gradio
+    async for reply in span_aiter("turn", _stream_turn_async(clean_text(user_input), session_id)):
+        yield reply
+
 
-    return result
+async def _stream_turn_async(user_input: str, session_id: str):
+    pending = _take_pending(user_input, session_id)
+    if pending:
+        customer_name, orders = pending
+        results = []
+        for order in orders:
+            results.append(await asyncio.to_thread(place_order, order, customer_name))
+            yield "\n".join(results)
+        return
+
+    intent = await classify_intent_async(user_input)
+    print(f"Intent: {intent}")
+
+    if intent == "detail_book":
+        yield await asyncio.to_thread(_answer_detail, user_input)
+    elif intent == "place_order":
+        yield EXTRACTING_MESSAGE
+        raw_output = ""
+        async for kind, value in stream_order_entities_async(user_input):
+            if kind == "token":
+                raw_output += value
+                yield f"{EXTRACTING_MESSAGE}\n{raw_output}"
+            else:
+                order = value
+        yield _queue_order(session_id, order)
+    else:
+        yield UNKNOWN_INTENT_MESSAGE
 
 
 if __name__ == "__main__":
+    warm_up()
+    print(format_startup_report())
     while True:
         user_input = input("Bạn: ")
         if user_input.lower() in ["exit", "quit"]:
@@ -0,0 +1,72 @@
+import argparse
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sentence_transformers import SentenceTransformer
+
+from linear_head import LinearHead, LINEAR_HEAD_PATH
+from training_embeddings import TrainingEmbeddingStore
+
+# So sánh XGBoost (model_xgb_1.pkl) và head tuyến tính (Create_model.py --head linear)
+# trên val_router_1.csv: độ chính xác, thời gian nạp và thời gian predict
+XGB_PATH = "model/model_xgb_1.pkl"
+LABEL_ENCODER_PATH = "model/label_encoder_1.pkl"
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+def timed_load(fn):
+    start = time.perf_counter()
+    obj = fn()
+    return obj, time.perf_counter() - start
+
+
+def predict_latency(predict, X: np.ndarray, repeat: int) -> tuple:
+    """(median µs for one row, µs per row for the whole matrix)."""
+    single = []
+    for i in range(repeat):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        predict(row)
+        single.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(10):
+        predict(X)
+    batch = (time.perf_counter() - start) / (10 * len(X))
+    return float(np.median(single)) * 1e6, batch * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh XGBoost và head tuyến tính")
+    parser.add_argument("--val", default="val_router_1.csv")
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.val)
+    texts = df["text"].tolist()
+    labels = np.array([x.strip() for x in df["label"]])
+
+    # Dùng chung cache embedding với Create_model.py
+    store = TrainingEmbeddingStore(MODEL_NAME, lambda: SentenceTransformer(MODEL_NAME))
+    X = store.encode(texts)
+
+    (clf, le), xgb_load = timed_load(lambda: (joblib.load(XGB_PATH), joblib.load(LABEL_ENCODER_PATH)))
+    head, head_load = timed_load(lambda: LinearHead.load(LINEAR_HEAD_PATH))
+
+    xgb_pred = le.inverse_transform(clf.predict(X))
+    head_pred = head.inverse_transform(head.predict(X))
+    xgb_single, xgb_batch = predict_latency(clf.predict, X, args.repeat)
+    head_single, head_batch = predict_latency(head.predict, X, args.repeat)
+
+    print(f"{len(texts)} câu trong {args.val}")
+    print(f"{'head':<10}{'accuracy':>10}{'load ms':>10}{'1 câu µs':>12}{'batch µs/câu':>15}")
+    print(f"{'xgboost':<10}{(xgb_pred == labels).mean():>10.4f}{xgb_load * 1000:>10.1f}"
+          f"{xgb_single:>12.1f}{xgb_batch:>15.2f}")
+    print(f"{'linear':<10}{(head_pred == labels).mean():>10.4f}{head_load * 1000:>10.1f}"
+          f"{head_single:>12.1f}{head_batch:>15.2f}")
+    print(f"Hai head cho cùng kết quả trên {(xgb_pred == head_pred).mean():.2%} số câu")
+
+
+if __name__ == "__main__":
+    main()
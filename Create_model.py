@@ -3,58 +3,91 @@ from sklearn.metrics import classification_report
 from sklearn.preprocessing import LabelEncoder
 import numpy as np
 import pandas as pd
+import argparse
 import joblib
 import xgboost as xgb
+from sklearn.linear_model import LogisticRegression
+from linear_head import LinearHead, LINEAR_HEAD_PATH
+from training_embeddings import TrainingEmbeddingStore
 
-model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
 
-df_train = pd.read_csv("train_router_1.csv")
-df_val   = pd.read_csv("val_router_1.csv")
 
-train_texts, train_labels = df_train["text"].tolist(), df_train["label"].tolist()
-val_texts, val_labels     = df_val["text"].tolist(), df_val["label"].tolist()
+def main():
+    # "xgb": XGBoost như trước; "linear": head logistic lưu dạng mảng NumPy (linear_head.py)
+    parser = argparse.ArgumentParser(description="Huấn luyện model phân loại intent")
+    parser.add_argument("--head", choices=["xgb", "linear", "both"], default="xgb")
+    args = parser.parse_args()
 
-train_labels = [x.strip() for x in train_labels]
-val_labels = [x.strip() for x in val_labels]
+    # Embedding được cache trên đĩa theo hash câu + tên model, chỉ encode câu mới
+    store = TrainingEmbeddingStore(MODEL_NAME, lambda: SentenceTransformer(MODEL_NAME))
 
-le = LabelEncoder()
-y_train = le.fit_transform(train_labels)
-y_val   = le.transform(val_labels)
+    df_train = pd.read_csv("train_router_1.csv")
+    df_val   = pd.read_csv("val_router_1.csv")
 
+    train_texts, train_labels = df_train["text"].tolist(), df_train["label"].tolist()
+    val_texts, val_labels     = df_val["text"].tolist(), df_val["label"].tolist()
 
-X_train = model.encode(train_texts, convert_to_numpy=True, show_progress_bar=True)
-X_val   = model.encode(val_texts, convert_to_numpy=True, show_progress_bar=True)
+    train_labels = [x.strip() for x in train_labels]
+    val_labels = [x.strip() for x in val_labels]
 
-# 5. Train XGBoost classifier
-clf = xgb.XGBClassifier(
-    objective="multi:softmax",
-    num_class=len(le.classes_),
-    eval_metric="mlogloss",
-    use_label_encoder=False,
-    n_estimators=300,
-    learning_rate=0.1,
-    max_depth=6,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    random_state=42
-)
+    le = LabelEncoder()
+    y_train = le.fit_transform(train_labels)
+    y_val   = le.transform(val_labels)
 
-clf.fit(X_train, y_train)
 
-y_pred = clf.predict(X_val)
-print(type(y_val), y_val.shape, y_val[:5])
-print(type(y_pred), y_pred.shape, y_pred[:5])
-print(classification_report(y_val, y_pred, target_names=le.classes_))
+    X_train = store.encode(train_texts)
+    X_val   = store.encode(val_texts)
+    print(f"Embedding: {store.stats['hits']} câu lấy từ cache, {store.stats['encoded']} câu encode mới")
 
-text = "Tôi muốn đặt 1 cuốn One Piece tập 20 ở Hà Nội"
-vec = model.encode([text], convert_to_numpy=True)
+    if args.head in ("xgb", "both"):
+        # 5. Train XGBoost classifier
+        clf = xgb.XGBClassifier(
+            objective="multi:softmax",
+            num_class=len(le.classes_),
+            eval_metric="mlogloss",
+            use_label_encoder=False,
+            n_estimators=300,
+            learning_rate=0.1,
+            max_depth=6,
+            subsample=0.8,
+            colsample_bytree=0.8,
+            random_state=42
+        )
 
-pred_class = clf.predict(vec)[0]
-# max_prob = np.max(probs)
-# pred_class = np.argmax(probs)
-label = le.inverse_transform([pred_class])[0]
+        clf.fit(X_train, y_train)
 
-print(label)
+        y_pred = clf.predict(X_val)
+        print(type(y_val), y_val.shape, y_val[:5])
+        print(type(y_pred), y_pred.shape, y_pred[:5])
+        print(classification_report(y_val, y_pred, target_names=le.classes_))
 
-joblib.dump(clf, "model/model_xgb_1.pkl")
-joblib.dump(le, "model/label_encoder_1.pkl")
+        text = "Tôi muốn đặt 1 cuốn One Piece tập 20 ở Hà Nội"
+        vec = store.encode([text])
+
+        pred_class = clf.predict(vec)[0]
+        # max_prob = np.max(probs)
+        # pred_class = np.argmax(probs)
+        label = le.inverse_transform([pred_class])[0]
+
+        print(label)
+
+        joblib.dump(clf, "model/model_xgb_1.pkl")
+        joblib.dump(le, "model/label_encoder_1.pkl")
+
+
+    if args.head in ("linear", "both"):
+        # Logistic regression trên embedding; xuất W, b ra .npy để nạp bằng mmap
+        lr = LogisticRegression(max_iter=1000, C=10.0)
+        lr.fit(X_train, y_train)
+        head = LinearHead.from_logistic(lr, le.classes_)
+
+        y_pred = head.predict(X_val)
+        print(classification_report(y_val, y_pred, target_names=le.classes_))
+        head.save(LINEAR_HEAD_PATH)
+        print(f"Đã lưu head tuyến tính vào {LINEAR_HEAD_PATH}.*")
+
+
+# encode_multi_process khởi động process con bằng spawn: code chạy phải nằm dưới __main__
+if __name__ == "__main__":
+    main()
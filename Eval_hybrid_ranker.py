@@ -0,0 +1,119 @@
+import argparse
+import csv
+import math
+import os
+import random
+import re
+import tempfile
+import time
+
+import sqlite_db
+from catalog_index import CatalogIndex, normalize_title
+from hybrid_ranker import DEFAULT_WEIGHTS, HybridRanker
+from synthetic_catalog import AUTHORS, CATEGORIES, perturb_title, synthetic_books
+from text_normalize import fold_title
+
+# Đánh giá độ liên quan + latency của HybridRanker: tên sách lấy từ các câu có '...'
+# trong bookstore_requests_balanced.csv, thêm sách giả lập làm nhiễu
+QUOTED_TITLE_RE = re.compile(r"'([^']+)'")
+CONFIGS = {
+    "fuzzy": {"bm25": 0.0, "fuzzy": 1.0, "semantic": 0.0},
+    "bm25": {"bm25": 1.0, "fuzzy": 0.0, "semantic": 0.0},
+    "hybrid": DEFAULT_WEIGHTS,
+}
+
+
+def quoted_titles(path: str) -> list:
+    titles = []
+    with open(path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            for title in QUOTED_TITLE_RE.findall(row["text"]):
+                if title.strip() and normalize_title(title) not in map(normalize_title, titles):
+                    titles.append(title.strip())
+    return titles
+
+
+def build_queries(titles: list, per_title: int, seed: int = 3) -> list:
+    """(query, expected title): exact, perturbed and accent-stripped variants."""
+    rng = random.Random(seed)
+    queries = []
+    for title in titles:
+        queries.append((title, title))
+        queries.append((fold_title(title), title))
+        for _ in range(per_title):
+            queries.append((perturb_title(title, rng), title))
+    return queries
+
+
+def evaluate(ranker: HybridRanker, queries: list, k: int) -> dict:
+    hits1 = hitsk = 0
+    rr = 0.0
+    latencies = []
+    for query, expected in queries:
+        start = time.perf_counter()
+        ranked = ranker.rank(query, k=k)
+        latencies.append(time.perf_counter() - start)
+        # So theo tên đã chuẩn hóa: dữ liệu có cả 'Không Gia Đình' lẫn 'Không gia đình'
+        titles = [normalize_title(row[1]) for row, _, _ in ranked]
+        expected = normalize_title(expected)
+        if expected in titles:
+            pos = titles.index(expected)
+            hits1 += pos == 0
+            hitsk += 1
+            rr += 1 / (pos + 1)
+    latencies.sort()
+    n = len(queries)
+    return {
+        "top1": hits1 / n,
+        f"recall@{k}": hitsk / n,
+        "mrr": rr / n,
+        "p50_ms": latencies[max(0, math.ceil(0.5 * n) - 1)] * 1000,
+        "p95_ms": latencies[max(0, math.ceil(0.95 * n) - 1)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đánh giá HybridRanker")
+    parser.add_argument("--data", default="bookstore_requests_balanced.csv")
+    parser.add_argument("--distractors", type=int, default=10000, help="số sách giả lập thêm vào catalog")
+    parser.add_argument("--per-title", type=int, default=5, help="số biến thể sai/thiếu mỗi tên")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--semantic", action="store_true", help="thêm điểm embedding (cần sentence-transformers)")
+    parser.add_argument("--weights", help="trọng số riêng, ví dụ bm25=0.3,fuzzy=0.5,semantic=0.2")
+    args = parser.parse_args()
+
+    titles = quoted_titles(args.data)
+    rng = random.Random(5)
+    books = [(t, rng.choice(AUTHORS), 100000, 10, rng.choice(CATEGORIES)) for t in titles]
+    books += list(synthetic_books(args.distractors))
+
+    workdir = tempfile.mkdtemp(prefix="hybrid_eval_")
+    db_path = os.path.join(workdir, "catalog.sqlite3")
+    sqlite_db.create_database(db_path, books)
+    catalog = CatalogIndex(sqlite_db.connect_factory(db_path))
+    catalog.ensure_loaded()
+
+    semantic = None
+    if args.semantic:
+        from sentence_transformers import SentenceTransformer
+        from semantic_search import SemanticIndex
+        model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+        semantic = SemanticIndex(model, catalog, os.path.join(workdir, "embeddings.npy"))
+        semantic.ensure_ready()
+
+    configs = dict(CONFIGS)
+    if args.weights:
+        configs["custom"] = {k: float(v) for k, v in (kv.split("=") for kv in args.weights.split(","))}
+
+    queries = build_queries(titles, args.per_title)
+    print(f"{len(titles)} tên sách, {len(catalog)} sách trong catalog, {len(queries)} truy vấn")
+    print(f"{'config':<10}{'top1':>8}{'recall@' + str(args.k):>10}{'mrr':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, weights in configs.items():
+        ranker = HybridRanker(catalog, semantic=semantic, weights=weights)
+        r = evaluate(ranker, queries, args.k)
+        print(f"{name:<10}{r['top1']:>8.3f}{r[f'recall@{args.k}']:>10.3f}{r['mrr']:>8.3f}"
+              f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
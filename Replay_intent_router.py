@@ -0,0 +1,156 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import Chatbot_demo
+from Benchmark_load import summarize
+from lazy_loader import startup_report, warm_up
+from text_normalize import clean_text
+
+# Phát lại một CSV có nhãn (text,label) qua đúng đường classify_intent của Chatbot_demo:
+# regex -> cache embedding -> embedding + XGBoost (qua micro-batcher).
+# Báo cáo độ chính xác, tỉ lệ đi tắt bằng regex và latency theo từng nhánh, kèm
+# "shadow": model dự đoán gì trên các câu regex đã đi tắt
+ROUTER_RESOURCES = ("embed_model", "clf", "label_encoder")
+BRANCHES = ("regex", "cache", "model")
+
+
+def load_rows(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [(row["text"], row["label"].strip()) for row in csv.DictReader(f)]
+
+
+def warm_router() -> None:
+    # Với INTENT_HEAD = "linear" không có label_encoder riêng
+    warm_up([name for name in ROUTER_RESOURCES if name in startup_report()])
+
+
+def route(text: str) -> tuple:
+    """(branch, intent, seconds) for one utterance, step by step as in classify_intent."""
+    start = time.perf_counter()
+    text = clean_text(text)
+    intent = Chatbot_demo.rule_based_intent(text)
+    if intent is not None:
+        return "regex", intent, time.perf_counter() - start
+    cached = Chatbot_demo.embedding_cache.get(text)
+    if cached is not None:
+        return "cache", cached[1], time.perf_counter() - start
+    intent = Chatbot_demo.intent_batcher(text)
+    return "model", intent, time.perf_counter() - start
+
+
+def replay(texts: list, workers: int, executor: str) -> tuple:
+    """Route every text on a thread or process pool; returns (results, wall seconds)."""
+    if executor == "process":
+        # spawn: mỗi process tự nạp model và có micro-batcher riêng
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=warm_router)
+        chunksize = max(1, len(texts) // (workers * 4))
+    else:
+        pool = ThreadPoolExecutor(workers)
+        chunksize = 1
+    with pool:
+        if executor == "process":
+            # Chờ mọi process nạp xong model để thời gian nạp không tính vào throughput
+            list(pool.map(time.sleep, [0.0] * workers))
+        start = time.perf_counter()
+        results = list(pool.map(route, texts, chunksize=chunksize))
+    return results, time.perf_counter() - start
+
+
+def shadow_predict(texts: list) -> tuple:
+    """Model-only intents for ``texts`` (not cached) and seconds per text."""
+    if not texts:
+        return [], 0.0
+    start = time.perf_counter()
+    emb = Chatbot_demo.embed_model.encode(texts, batch_size=64)
+    intents = list(Chatbot_demo.label_encoder.inverse_transform(Chatbot_demo.clf.predict(emb)))
+    return intents, (time.perf_counter() - start) / len(texts)
+
+
+def build_report(rows: list, results: list, wall: float, shadow: list, shadow_seconds: float) -> dict:
+    report = {"rows": len(rows), "wall_seconds": wall, "throughput_rps": len(rows) / wall if wall else 0.0,
+              "accuracy": sum(r[1] == label for r, (_, label) in zip(results, rows)) / len(rows),
+              "branches": {}}
+    for branch in BRANCHES:
+        picked = [(r, label) for r, (_, label) in zip(results, rows) if r[0] == branch]
+        if not picked:
+            continue
+        stats = summarize([r[2] for r, _ in picked], wall)
+        stats.pop("rps")
+        stats["share"] = len(picked) / len(rows)
+        stats["accuracy"] = sum(r[1] == label for r, label in picked) / len(picked)
+        stats["errors"] = dict(Counter(f"{label}->{r[1]}" for r, label in picked if r[1] != label))
+        report["branches"][branch] = stats
+    report["shortcut_hit_rate"] = report["branches"].get("regex", {}).get("share", 0.0)
+
+    if shadow:
+        labels = [label for r, (_, label) in zip(results, rows) if r[0] == "regex"]
+        routed = [r[1] for r in results if r[0] == "regex"]
+        model_ms = report["branches"].get("model", {}).get("p50_ms", shadow_seconds * 1000)
+        report["shadow"] = {
+            "rows": len(shadow),
+            "regex_accuracy": sum(p == l for p, l in zip(routed, labels)) / len(labels),
+            "model_accuracy": sum(p == l for p, l in zip(shadow, labels)) / len(labels),
+            "agreement": sum(p == q for p, q in zip(routed, shadow)) / len(labels),
+            # regex đúng mà model sai / regex sai mà model đúng
+            "regex_only_correct": sum(p == l != q for p, q, l in zip(routed, shadow, labels)),
+            "model_only_correct": sum(q == l != p for p, q, l in zip(routed, shadow, labels)),
+            "model_ms_saved_per_row": model_ms,
+        }
+    return report
+
+
+def print_report(report: dict, workers: int, executor: str) -> None:
+    print(f"{report['rows']} câu, {workers} {executor}, {report['wall_seconds']:.2f}s, "
+          f"{report['throughput_rps']:.1f} câu/s, accuracy {report['accuracy']:.4f}, "
+          f"đi tắt bằng regex {report['shortcut_hit_rate']:.1%}")
+    print(f"{'nhánh':<8}{'n':>7}{'tỉ lệ':>9}{'accuracy':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}  lỗi")
+    for branch, s in report["branches"].items():
+        errors = ", ".join(f"{k}: {v}" for k, v in s["errors"].items())
+        print(f"{branch:<8}{s['count']:>7}{s['share']:>9.1%}{s['accuracy']:>10.4f}"
+              f"{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['max_ms']:>10.2f}  {errors}")
+    shadow = report.get("shadow")
+    if shadow:
+        print(f"Trên {shadow['rows']} câu regex đi tắt: regex {shadow['regex_accuracy']:.4f}, "
+              f"model {shadow['model_accuracy']:.4f}, trùng nhau {shadow['agreement']:.1%}; "
+              f"chỉ regex đúng {shadow['regex_only_correct']}, chỉ model đúng {shadow['model_only_correct']}; "
+              f"tiết kiệm ~{shadow['model_ms_saved_per_row']:.2f} ms model mỗi câu")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phát lại CSV có nhãn qua bộ định tuyến intent")
+    parser.add_argument("--data", default="val_router_1.csv")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--repeat", type=int, default=1, help="phát lại mỗi câu nhiều lần (câu lặp sẽ trúng cache)")
+    parser.add_argument("--no-shadow", action="store_true", help="không chạy model trên các câu regex đã đi tắt")
+    parser.add_argument("--json", help="ghi kết quả ra file JSON")
+    args = parser.parse_args()
+
+    rows = load_rows(args.data) * args.repeat
+    texts = [text for text, _ in rows]
+    # Nạp model trước để latency nhánh model không tính thời gian nạp
+    warm_router()
+
+    results, wall = replay(texts, args.workers, args.executor)
+    shadow, shadow_seconds = [], 0.0
+    if not args.no_shadow:
+        shadow, shadow_seconds = shadow_predict([clean_text(t) for t, r in zip(texts, results) if r[0] == "regex"])
+
+    report = build_report(rows, results, wall, shadow, shadow_seconds)
+    print_report(report, args.workers, args.executor)
+    if args.executor == "thread":
+        report["micro_batcher"] = Chatbot_demo.intent_batcher.stats()
+        print(f"micro-batcher: {report['micro_batcher']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from db_utils import get_connection, pool_stats
+from Chatbot_demo import place_order
+from migrate_title_norm import insert_books
+
+# Kiểm tra đặt hàng song song: bắn nhiều đơn cùng lúc vào một cuốn sách,
+# tồn kho không được âm và số đơn thành công phải đúng bằng tồn kho ban đầu
+INITIAL_STOCK = 20
+PARALLEL_ORDERS = 100
+WORKERS = 32
+
+
+def create_test_book() -> tuple:
+    title = f"Concurrency test {uuid.uuid4().hex[:8]}"
+    conn = get_connection()
+    cursor = conn.cursor()
+    insert_books(cursor, [(title, "test", 1, INITIAL_STOCK, "test")])
+    book_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    return book_id, title
+
+
+def cleanup(book_id: int) -> None:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM orders WHERE book_id = %s", (book_id,))
+    cursor.execute("DELETE FROM books WHERE book_id = %s", (book_id,))
+    conn.commit()
+    conn.close()
+
+
+def read_state(book_id: int) -> tuple:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT stock FROM books WHERE book_id = %s", (book_id,))
+    stock = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(SUM(quantity), 0) FROM orders WHERE book_id = %s", (book_id,))
+    ordered = int(cursor.fetchone()[0])
+    conn.close()
+    return stock, ordered
+
+
+def main():
+    book_id, title = create_test_book()
+    order = {"book_title": title, "quantity": 1, "address": "Hà Nội", "phone": "0900000000"}
+    try:
+        with ThreadPoolExecutor(WORKERS) as ex:
+            results = list(ex.map(lambda i: place_order(dict(order), f"Test {i}"), range(PARALLEL_ORDERS)))
+
+        accepted = sum("đã được ghi nhận" in r for r in results)
+        stock, ordered = read_state(book_id)
+        print(f"accepted={accepted} rejected={PARALLEL_ORDERS - accepted} stock={stock} ordered={ordered}")
+        print(pool_stats())
+
+        assert stock >= 0, "tồn kho bị âm"
+        assert accepted == INITIAL_STOCK, f"nhận {accepted} đơn, tồn kho ban đầu {INITIAL_STOCK}"
+        assert ordered == INITIAL_STOCK - stock, "số lượng đã đặt không khớp phần kho bị trừ"
+        print("OK")
+    finally:
+        cleanup(book_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
 from langchain.llms import Ollama
 from fuzzywuzzy import process
+from db_utils import get_connection
+import order_regex
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -18,13 +20,6 @@ logger = logging.getLogger(__name__)
 # ------------------------
 # Configuration
 # ------------------------
-DB_CONFIG = {
-    "host": "localhost",
-    "user": "root",
-    "password": "17101975",  # Consider using environment variables
-    "database": "bookstore"
-}
-
 FUZZY_MATCH_THRESHOLD = 70
 DEFAULT_CUSTOMER_NAME = "Khách hàng"
 
@@ -58,10 +53,10 @@ def classify_intent(user_input: str) -> str:
 # ------------------------
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections."""
+    """Context manager for pooled database connections."""
     conn = None
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = get_connection()
         yield conn
     except mysql.connector.Error as e:
         logger.error(f"Database error: {e}")
@@ -173,61 +168,8 @@ def extract_order_entities(user_input: str) -> Dict[str, any]:
 
 
 def extract_order_entities_regex(user_input: str) -> Dict[str, any]:
-    """Fallback regex-based entity extraction."""
-    # Extract phone number
-    phone_patterns = [
-        r'(?:số điện thoại|sđt|đt|phone)[:\s]*([\d\s\-]{8,15})',
-        r'(\b(?:0[1-9]|84[1-9])[\d\s\-]{7,11}\b)'
-    ]
-    phone = "Unknown"
-    for pattern in phone_patterns:
-        match = re.search(pattern, user_input, re.IGNORECASE)
-        if match:
-            phone = re.sub(r'[\s\-]', '', match.group(1))
-            break
-
-    # Remove phone from input for cleaner address extraction
-    temp_input = user_input
-    for pattern in phone_patterns:
-        temp_input = re.sub(pattern, '', temp_input, flags=re.IGNORECASE)
-
-    # Extract address
-    addr_patterns = [
-        r'(?:giao|tới|đến|về|địa chỉ|ở)\s+([^,\d]*(?:[^\d,]*[a-zA-Zàáảãạăắằẳẵặâấầẩẫậèéẻẽẹêếềểễệđìíỉĩịòóỏõọôốồổỗộơớờởỡợùúủũụưứừửữựỳýỷỹỵ][^,]*)*)',
-        r'([a-zA-Zàáảãạăắằẳẵặâấầẩẫậèéẻẽẹêếềểễệđìíỉĩịòóỏõọôốồổỗộơớờởỡợùúủũụưứừửữựỳýỷỹỵ\s,]+(?:quận|huyện|phường|xã|thành phố|tỉnh)[^,]*)'
-    ]
-    address = "Unknown"
-    for pattern in addr_patterns:
-        match = re.search(pattern, temp_input, re.IGNORECASE)
-        if match:
-            address = match.group(1).strip().rstrip(",.")
-            break
-
-    # Extract quantity
-    qty_match = re.search(r'(\d+)\s*(?:cuốn|quyển|bản|cái)?', user_input, re.IGNORECASE)
-    quantity = int(qty_match.group(1)) if qty_match else 1
-
-    # Extract book title
-    book_patterns = [
-        r'(?:mua|đặt|order)\s*(?:\d+)?\s*(?:cuốn|quyển)?\s*(.+?)(?=\s*(?:giao|tới|đến|về|địa chỉ|số điện thoại)|$)',
-        r'(?:cuốn|quyển|sách)\s+(.+?)(?=\s*(?:giao|tới|đến|về)|$)',
-        r'^(.+?)(?=\s*(?:\d+\s*(?:cuốn|quyển))|(?:giao|tới|đến)|$)'
-    ]
-    book_title = "Unknown"
-    for pattern in book_patterns:
-        match = re.search(pattern, temp_input.strip(), re.IGNORECASE)
-        if match:
-            title = match.group(1).strip().rstrip(",.")
-            if title and len(title) > 2:
-                book_title = title
-                break
-
-    return {
-        "book_title": book_title,
-        "quantity": quantity,
-        "address": address,
-        "phone": phone
-    }
+    """Fallback regex-based entity extraction (shared precompiled engine)."""
+    return order_regex.extract_order_entities(user_input)
 
 
 # ------------------------
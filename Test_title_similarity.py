@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+import sqlite_db
+from catalog_index import CatalogIndex, normalize_title, similarity
+
+# Ghim các câu mà bản gốc (fuzzywuzzy WRatio, ngưỡng 85) tìm được: thừa từ ở đầu
+# ("giá", "sách") hoặc đảo thứ tự từ vẫn phải khớp đúng sách, sách gần giống thì không
+BOOKS = [
+    ("Naruto tập 20", "Masashi Kishimoto", 30000, 5, "manga"),
+    ("Naruto tập 2", "Masashi Kishimoto", 30000, 3, "manga"),
+    ("Không gia đình", "Hector Malot", 120000, 4, "tiểu thuyết"),
+    ("Nhà giả kim", "Paulo Coelho", 79000, 2, "tiểu thuyết"),
+]
+THRESHOLD = 85
+CASES = [
+    ("giá Naruto tập 20", "Naruto tập 20"),
+    ("sách Không gia đình", "Không gia đình"),
+    ("tập 20 Naruto", "Naruto tập 20"),
+    ("Narutoo tập 20", "Naruto tập 20"),
+    ("nha gia kim", "Nhà giả kim"),
+]
+MISSES = ["Đắc nhân tâm", "xyz"]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.db")
+        sqlite_db.create_database(path, BOOKS)
+        index = CatalogIndex(sqlite_db.connect_factory(path))
+
+        for query, expected in CASES:
+            score = similarity(normalize_title(query), normalize_title(expected))
+            match = index.best_match(query, threshold=THRESHOLD)
+            print(f"{query!r}: {score:.1f} -> {match[1] if match else None}")
+            assert score >= THRESHOLD, f"{query!r} chỉ đạt {score:.1f} với {expected!r}"
+            assert match is not None and match[1] == expected, f"{query!r} khớp {match}"
+
+        for query in MISSES:
+            match = index.best_match(query, threshold=THRESHOLD)
+            assert match is None, f"{query!r} không được khớp, nhận {match}"
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
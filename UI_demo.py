@@ -1,13 +1,27 @@
+import uuid
 import streamlit as st
-from Chatbot_demo import process_user_input
+from Chatbot_demo import process_user_input, warm_up, format_startup_report
+
+
+# Nạp model một lần cho cả tiến trình, các lần rerun của Streamlit dùng lại
+@st.cache_resource
+def load_models():
+    warm_up()
+    return format_startup_report()
+
 
 st.title("Chatbot BookStore Demo")
 
-if "pending_order" not in st.session_state:
-    st.session_state.pending_order = None
+startup_info = load_models()
+with st.expander("Thời gian khởi động"):
+    st.text(startup_info)
+
+# Mỗi phiên Streamlit có session_id riêng để giữ đơn chờ tên khách hàng
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 user_input = st.text_input("Bạn:", "")
 
 if user_input:
-    response = process_user_input(user_input)
+    response = process_user_input(user_input, session_id=st.session_state.session_id)
     st.text_area("Bot:", value=response, height=200)
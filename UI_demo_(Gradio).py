@@ -1,14 +1,27 @@
 import gradio as gr
-from Chatbot_demo import process_user_input
+from Chatbot_demo import process_user_input_async, process_user_input_stream_async, warm_up, format_startup_report
+
+
+CONCURRENCY_LIMIT = 16
+# Hiện câu trả lời (và token của LLM khi đọc đơn hàng) ngay khi có, không chờ cả câu
+STREAM_RESPONSES = True
 
 
 # Hàm xử lý hội thoại với Gradio
-def chatbot_ui(user_input, history):
-    # Gọi lại hàm chatbot bạn đã viết
-    response = process_user_input(user_input)
-    # history là list [(user, bot), ...]
-    history.append((user_input, response))
-    return history, history
+async def chatbot_ui(user_input, history, request: gr.Request):
+    # Gọi bản async để worker không bị chặn khi chờ LLM/MySQL;
+    # mỗi tab trình duyệt có session_hash riêng nên đơn chờ không bị lẫn
+    if not STREAM_RESPONSES:
+        response = await process_user_input_async(user_input, session_id=request.session_hash)
+        # history là list [(user, bot), ...]
+        history.append((user_input, response))
+        yield history, history
+        return
+
+    history.append((user_input, ""))
+    async for partial in process_user_input_stream_async(user_input, session_id=request.session_hash):
+        history[-1] = (user_input, partial)
+        yield history, history
 
 
 with gr.Blocks() as demo:
@@ -23,5 +36,11 @@ with gr.Blocks() as demo:
     msg.submit(chatbot_ui, [msg, state], [chatbot, state])
     clear.click(lambda: ([], []), None, [chatbot, state])
 
+# Cho phép nhiều hội thoại được xử lý cùng lúc
+demo.queue(default_concurrency_limit=CONCURRENCY_LIMIT)
+
 if __name__ == "__main__":
+    # Nạp model trước khi mở UI để tin nhắn đầu tiên không phải chờ
+    warm_up()
+    print(format_startup_report())
     demo.launch(share = True)
\ No newline at end of file
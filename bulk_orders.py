@@ -0,0 +1,182 @@
+import argparse
+import csv
+import json
+import time
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Iterator, List
+
+from db_utils import get_connection, run_in_transaction
+from catalog_index import CatalogIndex, normalize_title
+
+CHUNK_SIZE = 500
+MATCH_THRESHOLD = 85
+DEFAULT_CUSTOMER_NAME = "Khách hàng"
+REPORT_FIELDS = ["row", "status", "book_id", "matched_title", "quantity", "message"]
+
+
+def read_orders(path: str) -> Iterator[dict]:
+    """Stream order rows from a CSV (header row) or JSONL file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def chunked(iterable, size: int) -> Iterator[list]:
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BulkOrderIngestor:
+    """Ingest many orders with batched title resolution and inserts.
+
+    Titles are resolved once per distinct normalized title against an
+    in-memory catalog; each chunk locks its books with one
+    ``SELECT ... FOR UPDATE``, allocates stock row by row in file order and
+    writes orders and stock decrements with ``executemany`` in a single
+    transaction.
+    """
+
+    def __init__(self, catalog: CatalogIndex = None, chunk_size: int = CHUNK_SIZE):
+        self.catalog = catalog or CatalogIndex(get_connection)
+        self.chunk_size = chunk_size
+        self._resolved: Dict[str, tuple] = {}
+
+    def resolve(self, title: str):
+        key = normalize_title(title)
+        if key not in self._resolved:
+            self._resolved[key] = self.catalog.best_match(key, threshold=MATCH_THRESHOLD)
+        return self._resolved[key]
+
+    def _prepare(self, row_no: int, raw: dict) -> dict:
+        result = {"row": row_no, "status": "rejected", "book_id": None,
+                  "matched_title": None, "quantity": None, "message": ""}
+        title = str(raw.get("book_title") or "").strip()
+        try:
+            quantity = int(raw.get("quantity") or 1)
+        except (TypeError, ValueError):
+            result["message"] = f"Số lượng không hợp lệ: {raw.get('quantity')!r}"
+            return result
+        if quantity <= 0:
+            result["message"] = f"Số lượng không hợp lệ: {quantity}"
+            return result
+        match = self.resolve(title) if title else None
+        if match is None:
+            result["message"] = f"Không tìm thấy sách '{title}'"
+            return result
+        result.update(book_id=match[0], matched_title=match[1], quantity=quantity,
+                      status="pending", order=raw)
+        return result
+
+    def _write_chunk(self, conn, pending: List[dict]) -> dict:
+        cursor = conn.cursor()
+        book_ids = sorted({r["book_id"] for r in pending})
+        placeholders = ", ".join(["%s"] * len(book_ids))
+        # Khóa các dòng sách theo thứ tự book_id để tránh deadlock giữa các chunk song song
+        cursor.execute(
+            f"SELECT book_id, stock FROM books WHERE book_id IN ({placeholders}) ORDER BY book_id FOR UPDATE",
+            book_ids
+        )
+        stock = {book_id: s for book_id, s in cursor.fetchall()}
+
+        inserts = []
+        decrements = defaultdict(int)
+        for r in pending:
+            available = stock.get(r["book_id"], 0)
+            if r["quantity"] > available:
+                r["status"] = "rejected"
+                r["message"] = f"Chỉ còn {available} quyển"
+                continue
+            stock[r["book_id"]] = available - r["quantity"]
+            decrements[r["book_id"]] += r["quantity"]
+            order = r["order"]
+            inserts.append((str(order.get("customer_name") or DEFAULT_CUSTOMER_NAME).strip(),
+                            str(order.get("phone") or "Unknown").strip(),
+                            str(order.get("address") or "Unknown").strip(),
+                            r["book_id"], r["quantity"], "pending"))
+            r["status"] = "accepted"
+            r["message"] = ""
+
+        if inserts:
+            cursor.executemany("""
+                INSERT INTO orders (customer_name, phone, address, book_id, quantity, status)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, inserts)
+            cursor.executemany(
+                "UPDATE books SET stock = stock - %s WHERE book_id = %s",
+                [(qty, book_id) for book_id, qty in decrements.items()]
+            )
+        return decrements
+
+    def ingest(self, rows) -> Iterator[dict]:
+        """Yield one result per input row, in input order."""
+        row_iter = enumerate(rows, start=1)
+        for chunk in chunked(row_iter, self.chunk_size):
+            results = [self._prepare(row_no, raw) for row_no, raw in chunk]
+            pending = [r for r in results if r["status"] == "pending"]
+            if pending:
+                try:
+                    decrements = run_in_transaction(lambda conn: self._write_chunk(conn, pending))
+                except Exception as e:
+                    for r in pending:
+                        r["status"] = "error"
+                        r["message"] = str(e)
+                else:
+                    for book_id, qty in decrements.items():
+                        self.catalog.adjust_stock(book_id, -qty)
+            for r in results:
+                r.pop("order", None)
+                yield r
+
+
+def ingest_file(path: str, report_path: str = None, chunk_size: int = CHUNK_SIZE) -> dict:
+    """Ingest ``path``, optionally write a per-row CSV report, return a summary."""
+    ingestor = BulkOrderIngestor(chunk_size=chunk_size)
+    ingestor.catalog.ensure_loaded()
+    counts = defaultdict(int)
+    start = time.perf_counter()
+
+    report_file = open(report_path, "w", encoding="utf-8", newline="") if report_path else None
+    try:
+        writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS) if report_file else None
+        if writer:
+            writer.writeheader()
+        for result in ingestor.ingest(read_orders(path)):
+            counts[result["status"]] += 1
+            if writer:
+                writer.writerow(result)
+    finally:
+        if report_file:
+            report_file.close()
+
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    return {
+        "rows": total,
+        "accepted": counts["accepted"],
+        "rejected": counts["rejected"],
+        "errors": counts["error"],
+        "seconds": elapsed,
+        "rows_per_second": total / elapsed if elapsed else 0.0
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nhập đơn hàng hàng loạt từ CSV/JSONL")
+    parser.add_argument("path", help="file CSV hoặc JSONL: book_title, quantity, customer_name, phone, address")
+    parser.add_argument("--report", help="ghi kết quả từng dòng ra file CSV")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    summary = ingest_file(args.path, args.report, args.chunk_size)
+    print(f"{summary['rows']} dòng: {summary['accepted']} nhận, {summary['rejected']} từ chối, "
+          f"{summary['errors']} lỗi trong {summary['seconds']:.2f}s "
+          f"({summary['rows_per_second']:.0f} dòng/s)")
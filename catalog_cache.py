@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+
+from catalog_index import BOOK_SELECT
+
+STOCK_TTL = 30.0        # giây trước khi đọc lại tồn kho từ DB
+MAX_BOOKS = 50000
+
+
+class BookRecord:
+    __slots__ = ("book_id", "title", "author", "price", "category", "stock", "stock_at")
+
+    def __init__(self, book_id, title, author, price, stock, category, now: float):
+        self.book_id = book_id
+        self.title = title
+        self.author = author
+        self.price = price
+        self.category = category
+        self.stock = stock
+        self.stock_at = now
+
+    def row(self) -> tuple:
+        return self.book_id, self.title, self.author, self.price, self.stock, self.category
+
+
+class CatalogCache:
+    """Read-through cache of book rows by book_id.
+
+    Title, author, price and category rarely change and are kept until
+    ``refresh`` is called for a book; stock is re-read after ``stock_ttl``
+    seconds, or on the next read after ``invalidate_stock`` (called on
+    every write). ``set_stock`` stores a value just read from the DB. Misses and stale stock for a whole
+    batch of ids are fetched with one query each. Least recently used books
+    are evicted beyond ``max_books``.
+    """
+
+    def __init__(self, connect: Callable, stock_ttl: float = STOCK_TTL, max_books: int = MAX_BOOKS):
+        self._connect = connect
+        self.stock_ttl = stock_ttl
+        self.max_books = max_books
+        self._records: "OrderedDict[int, BookRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stock_refreshes": 0, "queries": 0}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _query(self, sql: str, ids: List[int]) -> list:
+        placeholders = ", ".join(["%s"] * len(ids))
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql.format(placeholders), tuple(ids))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+            with self._lock:
+                self.stats["queries"] += 1
+
+    def put(self, rows: Iterable, now: float = None) -> None:
+        """Store full ``books`` rows (book_id, title, author, price, stock, category)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for book_id, title, author, price, stock, category in rows:
+                self._records[book_id] = BookRecord(book_id, title, author, price, stock, category, now)
+                self._records.move_to_end(book_id)
+            while len(self._records) > self.max_books:
+                self._records.popitem(last=False)
+
+    def get_many(self, book_ids: List[int]) -> List[tuple]:
+        """Rows for ``book_ids`` in the given order; unknown ids are skipped."""
+        now = time.monotonic()
+        with self._lock:
+            missing = [b for b in book_ids if b not in self._records]
+            stale = [b for b in book_ids if b in self._records
+                     and now - self._records[b].stock_at > self.stock_ttl]
+            self.stats["hits"] += len(book_ids) - len(missing)
+            self.stats["misses"] += len(missing)
+
+        if missing:
+            self.put(self._query(BOOK_SELECT + " WHERE book_id IN ({})", missing), now)
+        if stale:
+            fresh = self._query("SELECT book_id, stock FROM books WHERE book_id IN ({})", stale)
+            with self._lock:
+                self.stats["stock_refreshes"] += len(stale)
+                for book_id, stock in fresh:
+                    record = self._records.get(book_id)
+                    if record is not None:
+                        record.stock = stock
+                        record.stock_at = now
+
+        with self._lock:
+            rows = []
+            for b in book_ids:
+                record = self._records.get(b)
+                if record is not None:
+                    self._records.move_to_end(b)
+                    rows.append(record.row())
+            return rows
+
+    def get(self, book_id: int) -> Optional[tuple]:
+        rows = self.get_many([book_id])
+        return rows[0] if rows else None
+
+    def set_stock(self, book_id: int, stock: int) -> None:
+        with self._lock:
+            record = self._records.get(book_id)
+            if record is not None:
+                record.stock = stock
+                record.stock_at = time.monotonic()
+
+    def invalidate_stock(self, book_id: int) -> None:
+        # Sau khi ghi kho: lần đọc tới lấy lại từ DB thay vì cộng trừ trên giá trị có thể đã cũ
+        with self._lock:
+            record = self._records.get(book_id)
+            if record is not None:
+                record.stock_at = float("-inf")
+
+    def refresh(self, book_ids: List[int]) -> None:
+        """Re-read all fields of ``book_ids`` (e.g. after a price or title change)."""
+        if book_ids:
+            self.put(self._query(BOOK_SELECT + " WHERE book_id IN ({})", list(book_ids)))
@@ -0,0 +1,263 @@
+import heapq
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from text_normalize import fold_title, fold_titles
+
+# Thứ tự cột của một dòng trong index, khớp với bảng books
+BOOK_COLUMNS = ("book_id", "title", "author", "price", "stock", "category")
+BOOK_SELECT = "SELECT book_id, title, author, price, stock, category FROM books"
+
+NGRAM_SIZE = 3
+SHORTLIST_SIZE = 20
+REFRESH_INTERVAL = 300  # giây giữa hai lần refresh tăng dần
+
+
+# Khóa so khớp dùng chung (text_normalize): bỏ dấu, đ -> d, nên 'Không Gia Đình',
+# 'không gia đình' và 'khong gia dinh' trùng nhau; gọi lại trên khóa đã chuẩn hóa không đổi gì
+normalize_title = fold_title
+
+
+def char_ngrams(text: str, n: int = NGRAM_SIZE) -> set:
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Edit distance with a two-row DP table."""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def ratio(a: str, b: str) -> float:
+    longest = max(len(a), len(b))
+    if not longest:
+        return 100.0
+    return 100.0 * (1 - levenshtein(a, b) / longest)
+
+
+def partial_ratio(shorter: str, longer: str) -> float:
+    """Best ``ratio`` of ``shorter`` against every window of ``longer`` of the same length."""
+    if len(shorter) > len(longer):
+        shorter, longer = longer, shorter
+    if not shorter:
+        return 0.0
+    width = len(shorter)
+    return max(ratio(shorter, longer[i:i + width]) for i in range(len(longer) - width + 1))
+
+
+def token_sort_ratio(a: str, b: str) -> float:
+    return ratio(" ".join(sorted(a.split())), " ".join(sorted(b.split())))
+
+
+def token_set_ratio(a: str, b: str, partial: bool = False) -> float:
+    """Compare the shared words alone and with each side's extra words appended."""
+    words_a, words_b = set(a.split()), set(b.split())
+    common = " ".join(sorted(words_a & words_b))
+    with_a = f"{common} {' '.join(sorted(words_a - words_b))}".strip()
+    with_b = f"{common} {' '.join(sorted(words_b - words_a))}".strip()
+    # common là tiền tố của with_a/with_b: partial_ratio của chúng là 100, ratio chỉ
+    # là tỉ lệ độ dài, nên chỉ cặp (with_a, with_b) phải tính edit distance
+    if partial:
+        return 100.0 if common else partial_ratio(with_a, with_b)
+    prefix = 100.0 * len(common) / min(len(with_a), len(with_b))
+    return max(prefix, ratio(with_a, with_b))
+
+
+def similarity(query: str, title: str) -> float:
+    """Score in [0, 100] computed like fuzzywuzzy's WRatio, on normalized strings.
+
+    Full-string ratio, plus token-sort and token-set ratios scaled by 0.95, so
+    extra or reordered words ('sach khong gia dinh', 'tap 20 naruto') still
+    reach the threshold of 85. When one string is at least 1.5x longer, the
+    window (partial) versions are used instead, scaled by a further 0.9.
+    Levenshtein rather than difflib, so scores differ from WRatio by a few points.
+    """
+    score = ratio(query, title)
+    shorter, longer = sorted((query, title), key=len)
+    if shorter and len(longer) / len(shorter) >= 1.5:
+        # partial token-sort <= partial token-set ở đây, nên chỉ cần token-set
+        return max(score,
+                   0.9 * partial_ratio(shorter, longer),
+                   0.95 * 0.9 * token_set_ratio(query, title, partial=True))
+    if score >= 95.0:  # điểm token tối đa 95, không vượt được
+        return score
+    return max(score,
+               0.95 * token_sort_ratio(query, title),
+               0.95 * token_set_ratio(query, title))
+
+
+class CatalogIndex:
+    """In-memory title index over the books table.
+
+    Rows are loaded once and refreshed incrementally (new book_ids only);
+    fuzzy lookups prune candidates through a character n-gram inverted index
+    and only score the shortlist with edit distance.
+    """
+
+    def __init__(self, connect: Callable, refresh_interval: float = REFRESH_INTERVAL,
+                 shortlist_size: int = SHORTLIST_SIZE):
+        self._connect = connect
+        self.refresh_interval = refresh_interval
+        self.shortlist_size = shortlist_size
+        self._lock = threading.RLock()
+        self._rows: Dict[int, tuple] = {}
+        self._norm_titles: Dict[int, str] = {}
+        self._grams: Dict[int, set] = {}
+        self._postings: Dict[str, set] = defaultdict(set)
+        self._refreshed_id = 0  # mốc book_id cho refresh, chỉ load/refresh dời mốc
+        self.version = 0  # tăng khi có sách mới hoặc tên/tác giả/thể loại đổi (không tính tồn kho)
+        self._loaded = False
+        self._last_refresh = 0.0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _fetch(self, query: str, params: tuple = ()) -> List[tuple]:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def load(self) -> None:
+        rows = self._fetch(BOOK_SELECT)
+        with self._lock:
+            self._rows.clear()
+            self._norm_titles.clear()
+            self._grams.clear()
+            self._postings.clear()
+            self.upsert(rows)
+            self._refreshed_id = max((row[0] for row in rows), default=0)
+            self._loaded = True
+            self._last_refresh = time.monotonic()
+
+    def refresh(self) -> int:
+        """Pull books added since the last load/refresh; returns how many."""
+        # upsert lẻ (vd. từ lookup_book) không dời mốc, nên sách chèn trước nó vẫn được kéo về
+        rows = self._fetch(BOOK_SELECT + " WHERE book_id > %s", (self._refreshed_id,))
+        with self._lock:
+            self.upsert(rows)
+            self._refreshed_id = max([self._refreshed_id] + [row[0] for row in rows])
+            self._last_refresh = time.monotonic()
+        return len(rows)
+
+    def ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+        elif time.monotonic() - self._last_refresh > self.refresh_interval:
+            self.refresh()
+
+    def upsert(self, rows) -> None:
+        rows = [tuple(row) for row in rows]
+        # Chuẩn hóa tên của cả batch một lần (cả catalog khi load)
+        norms = fold_titles(row[1] for row in rows)
+        with self._lock:
+            for row, norm in zip(rows, norms):
+                book_id = row[0]
+                old_norm = self._norm_titles.get(book_id)
+                if old_norm != norm:
+                    for gram in self._grams.get(book_id, ()):
+                        self._postings[gram].discard(book_id)
+                    grams = char_ngrams(norm)
+                    for gram in grams:
+                        self._postings[gram].add(book_id)
+                    self._grams[book_id] = grams
+                    self._norm_titles[book_id] = norm
+                old = self._rows.get(book_id)
+                if old is None or (old[1], old[2], old[5]) != (row[1], row[2], row[5]):
+                    self.version += 1
+                self._rows[book_id] = row
+
+    def update_stock(self, book_id: int, stock: int) -> None:
+        with self._lock:
+            row = self._rows.get(book_id)
+            if row is not None:
+                self._rows[book_id] = row[:4] + (stock,) + row[5:]
+
+    def adjust_stock(self, book_id: int, delta: int) -> None:
+        with self._lock:
+            row = self._rows.get(book_id)
+            if row is not None:
+                self._rows[book_id] = row[:4] + (max(0, row[4] + delta),) + row[5:]
+
+    def get(self, book_id: int) -> Optional[tuple]:
+        return self._rows.get(book_id)
+
+    def normalized_title(self, book_id: int) -> str:
+        return self._norm_titles.get(book_id, "")
+
+    def rows(self) -> List[tuple]:
+        self.ensure_loaded()
+        with self._lock:
+            return [self._rows[b] for b in sorted(self._rows)]
+
+    def shortlist(self, norm_query: str) -> List[int]:
+        query_grams = char_ngrams(norm_query)
+        counts: Dict[int, int] = defaultdict(int)
+        for gram in query_grams:
+            for book_id in self._postings.get(gram, ()):
+                counts[book_id] += 1
+        # Xếp theo tỉ lệ n-gram chung so với chuỗi ngắn hơn (bắt cả khớp một phần)
+        # nlargest thay vì sort toàn bộ: query có trigram phổ biến chạm tới hàng nghìn sách
+        return heapq.nlargest(
+            self.shortlist_size,
+            counts,
+            key=lambda b: counts[b] / min(len(query_grams), len(self._grams[b]))
+        )
+
+    def containing(self, book_title: str, limit: int = 20) -> List[int]:
+        """book_ids whose normalized title contains the normalized query, like ``LIKE '%...%'``."""
+        self.ensure_loaded()
+        norm_query = normalize_title(book_title)
+        if len(norm_query) < NGRAM_SIZE:
+            return []
+        grams = {norm_query[i:i + NGRAM_SIZE] for i in range(len(norm_query) - NGRAM_SIZE + 1)}
+        with self._lock:
+            # Giao các posting list từ ngắn tới dài, rồi mới kiểm tra chuỗi con thật
+            postings = sorted((self._postings.get(g, set()) for g in grams), key=len)
+            ids = set(postings[0])
+            for posting in postings[1:]:
+                if not ids:
+                    break
+                ids &= posting
+            return sorted(b for b in ids if norm_query in self._norm_titles[b])[:limit]
+
+    def search(self, book_title: str, limit: int = 1) -> List[Tuple[tuple, float]]:
+        """Best matching rows with their similarity scores, highest first."""
+        self.ensure_loaded()
+        norm_query = normalize_title(book_title)
+        if not norm_query:
+            return []
+        with self._lock:
+            scored = [(self._rows[b], similarity(norm_query, self._norm_titles[b]))
+                      for b in self.shortlist(norm_query)]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit]
+
+    def best_match(self, book_title: str, threshold: float = 85) -> Optional[tuple]:
+        matches = self.search(book_title, limit=1)
+        if matches and matches[0][1] >= threshold:
+            return matches[0][0]
+        return None
@@ -1,12 +1,221 @@
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+
 import mysql.connector
 
+DB_CONFIG = {
+    "host": os.environ.get("BOOKSTORE_DB_HOST", "localhost"),
+    "user": os.environ.get("BOOKSTORE_DB_USER", "root"),
+    "password": os.environ.get("BOOKSTORE_DB_PASSWORD", "17101975"),
+    "database": os.environ.get("BOOKSTORE_DB_NAME", "bookstore")
+}
+
+POOL_SIZE = int(os.environ.get("BOOKSTORE_DB_POOL_SIZE", "8"))
+CHECKOUT_TIMEOUT = float(os.environ.get("BOOKSTORE_DB_CHECKOUT_TIMEOUT", "5"))
+# Kết nối nằm chờ lâu hơn số giây này sẽ được ping trước khi cho mượn
+HEALTH_CHECK_INTERVAL = float(os.environ.get("BOOKSTORE_DB_HEALTH_CHECK_INTERVAL", "30"))
+
+# ER_LOCK_DEADLOCK và ER_LOCK_WAIT_TIMEOUT: transaction bị hủy, chạy lại là an toàn
+RETRYABLE_ERRNOS = (1213, 1205)
+TRANSACTION_RETRIES = 3
+RETRY_BACKOFF = 0.05
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the checkout timeout."""
+
+
+class PooledConnection:
+    """Proxy around a pooled connection; ``close()`` returns it to the pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise mysql.connector.errors.OperationalError("Connection already returned to pool")
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Bounded MySQL connection pool with health checks and usage metrics."""
+
+    def __init__(self, connect=None, size: int = POOL_SIZE, timeout: float = CHECKOUT_TIMEOUT,
+                 health_check_interval: float = HEALTH_CHECK_INTERVAL):
+        self._connect = connect or (lambda: mysql.connector.connect(**DB_CONFIG))
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._metrics = {
+            "checkouts": 0,
+            "created": 0,
+            "reused": 0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "discarded": 0,
+            "in_use": 0,
+            "peak_in_use": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    def _healthy(self, conn) -> bool:
+        try:
+            conn.ping(reconnect=True, attempts=1, delay=0)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn) -> None:
+        with self._lock:
+            self._metrics["discarded"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout: float = None) -> PooledConnection:
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self._metrics["timeouts"] += 1
+            raise PoolTimeout(f"No database connection available after {timeout}s "
+                              f"(pool size {self.size})")
+        try:
+            conn = None
+            while conn is None:
+                try:
+                    candidate, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect()
+                    with self._lock:
+                        self._metrics["created"] += 1
+                    break
+                if time.monotonic() - last_used < self.health_check_interval or self._healthy(candidate):
+                    conn = candidate
+                    with self._lock:
+                        self._metrics["reused"] += 1
+                else:
+                    with self._lock:
+                        self._metrics["health_check_failures"] += 1
+                    self._discard(candidate)
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.monotonic() - start
+        with self._lock:
+            m = self._metrics
+            m["checkouts"] += 1
+            m["in_use"] += 1
+            m["peak_in_use"] = max(m["peak_in_use"], m["in_use"])
+            m["wait_seconds_total"] += waited
+            m["wait_seconds_max"] = max(m["wait_seconds_max"], waited)
+        return PooledConnection(self, conn)
+
+    def release(self, conn) -> None:
+        try:
+            # Kết thúc transaction dở dang để lần mượn sau không thấy snapshot cũ
+            conn.rollback()
+            self._idle.put((conn, time.monotonic()))
+        except Exception:
+            self._discard(conn)
+        finally:
+            with self._lock:
+                self._metrics["in_use"] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._metrics)
+        stats["size"] = self.size
+        stats["idle"] = self._idle.qsize()
+        return stats
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+pool = ConnectionPool()
+
+
+def configure_pool(**kwargs) -> ConnectionPool:
+    """Replace the shared pool, e.g. with a different size or connect function."""
+    global pool
+    pool.close_all()
+    pool = ConnectionPool(**kwargs)
+    return pool
+
+
 def get_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="17101975",
-        database="bookstore"
-    )
+    return pool.acquire()
+
+
+def pool_stats() -> dict:
+    return pool.stats()
+
+
+def run_in_transaction(work, retries: int = TRANSACTION_RETRIES):
+    """Run ``work(conn)`` in one transaction on a pooled connection.
+
+    Commits if ``work`` returns, rolls back if it raises. Deadlocks and lock
+    wait timeouts are retried with jittered exponential backoff.
+    """
+    for attempt in range(retries):
+        conn = get_connection()
+        try:
+            conn.start_transaction()
+            result = work(conn)
+            conn.commit()
+            return result
+        except mysql.connector.Error as e:
+            conn.rollback()
+            if e.errno in RETRYABLE_ERRNOS and attempt < retries - 1:
+                time.sleep(RETRY_BACKOFF * (2 ** attempt) * (1 + random.random()))
+                continue
+            raise
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
 
 def fetch_books():
     conn = get_connection()
@@ -20,3 +229,4 @@ def fetch_books():
 if __name__ == "__main__":
     for book in fetch_books():
         print(book)
+    print(pool_stats())
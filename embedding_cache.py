@@ -0,0 +1,80 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from text_normalize import normalize_text as normalize_utterance
+
+
+class EmbeddingCache:
+    """Bounded LRU cache of utterance embeddings and intent predictions.
+
+    Keys are normalized utterances, values ``(embedding, intent)``. With a
+    ``path`` the cache is loaded from and saved to a pickle file so it
+    survives restarts.
+    """
+
+    def __init__(self, max_size: int = 10000, path: Optional[str] = None):
+        self.max_size = max_size
+        self.path = path
+        self._data: "OrderedDict[str, Tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, text: str) -> Optional[Tuple]:
+        key = normalize_utterance(text)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, text: str, embedding, intent: str) -> None:
+        key = normalize_utterance(text)
+        with self._lock:
+            self._data[key] = (embedding, intent)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def load(self) -> None:
+        with open(self.path, "rb") as f:
+            items = pickle.load(f)
+        with self._lock:
+            self._data = OrderedDict(items[-self.max_size:])
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            items = list(self._data.items())
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(items, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,143 @@
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from catalog_index import CatalogIndex, char_ngrams, normalize_title, similarity
+
+# Trọng số mặc định của từng tín hiệu; semantic bị bỏ qua (và chia lại trọng số)
+# khi không có SemanticIndex
+DEFAULT_WEIGHTS = {"bm25": 0.35, "fuzzy": 0.5, "semantic": 0.15}
+MAX_CANDIDATES = 200
+FUZZY_CANDIDATES = 20    # số ứng viên tối đa được tính edit distance
+OVERLAP_CANDIDATES = 100  # số ứng viên tiếp theo chỉ tính tỉ lệ trigram chung
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class HybridRanker:
+    """Rank catalog rows by BM25 tokens, trigram fuzzy score and embeddings.
+
+    Candidates are the union of the BM25 top ``max_candidates`` (rarest
+    query tokens first, common tokens only re-score existing candidates),
+    the catalog's trigram shortlist and, if given, the semantic top-k.
+    Edit distance is computed for the shortlist and the best pre-scored
+    candidates, at most ``fuzzy_candidates``; the next
+    ``overlap_candidates`` get trigram overlap and the rest are dropped.
+    Work is capped by candidate counts, not time, so rankings do not
+    depend on machine load. All signals are scaled to [0, 1] and combined with tunable weights.
+    """
+
+    def __init__(self, catalog: CatalogIndex, semantic=None, weights: Dict[str, float] = None,
+                 max_candidates: int = MAX_CANDIDATES, fuzzy_candidates: int = FUZZY_CANDIDATES,
+                 overlap_candidates: int = OVERLAP_CANDIDATES):
+        self.catalog = catalog
+        self.semantic = semantic
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.max_candidates = max_candidates
+        self.fuzzy_candidates = fuzzy_candidates
+        self.overlap_candidates = overlap_candidates
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+
+    def _sync(self) -> None:
+        # Đánh index BM25 cho các sách mới có trong catalog
+        self.catalog.ensure_loaded()
+        if len(self._doc_len) == len(self.catalog):
+            return
+        with self._lock:
+            for row in self.catalog.rows():
+                book_id = row[0]
+                if book_id in self._doc_len:
+                    continue
+                tokens = self.catalog.normalized_title(book_id).split()
+                for token in tokens:
+                    self._postings[token][book_id] = self._postings[token].get(book_id, 0) + 1
+                self._doc_len[book_id] = len(tokens)
+                self._total_len += len(tokens)
+
+    def bm25(self, tokens: List[str]) -> Dict[int, float]:
+        n = len(self._doc_len)
+        if not n:
+            return {}
+        avgdl = self._total_len / n
+        scores: Dict[int, float] = {}
+        for token in sorted(set(tokens), key=lambda t: len(self._postings.get(t, ()))):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            if len(scores) < self.max_candidates:
+                items = postings.items()
+            else:
+                items = [(b, postings[b]) for b in scores if b in postings]
+            for book_id, tf in items:
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[book_id] / avgdl)
+                scores[book_id] = scores.get(book_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        if len(scores) > self.max_candidates:
+            top = sorted(scores, key=scores.get, reverse=True)[:self.max_candidates]
+            scores = {b: scores[b] for b in top}
+        return scores
+
+    def _active_weights(self) -> Dict[str, float]:
+        active = {k: w for k, w in self.weights.items()
+                  if w > 0 and (k != "semantic" or self.semantic is not None)}
+        total = sum(active.values()) or 1.0
+        return {k: w / total for k, w in active.items()}
+
+    def rank(self, query: str, k: int = 5) -> List[Tuple[tuple, float, Dict[str, float]]]:
+        """Top ``k`` rows as ``(row, score, {signal: value})``, best first."""
+        self._sync()
+        norm_query = normalize_title(query)
+        if not norm_query:
+            return []
+        weights = self._active_weights()
+
+        bm25 = self.bm25(norm_query.split()) if "bm25" in weights else {}
+        top_bm25 = max(bm25.values(), default=0.0) or 1.0
+        semantic: Dict[int, float] = {}
+        if "semantic" in weights:
+            for row, score in self.semantic.search(query, k=min(self.max_candidates, 50)):
+                semantic[row[0]] = max(0.0, score)
+
+        candidates = set(bm25) | set(semantic)
+        shortlist = self.catalog.shortlist(norm_query) if "fuzzy" in weights else []
+        candidates.update(shortlist)
+
+        # Điểm sơ bộ không cần edit distance quyết định thứ tự tính fuzzy
+        signals = {b: {"bm25": bm25.get(b, 0.0) / top_bm25, "semantic": semantic.get(b, 0.0)}
+                   for b in candidates}
+        prescore = {b: weights.get("bm25", 0) * s["bm25"] + weights.get("semantic", 0) * s["semantic"]
+                    for b, s in signals.items()}
+        if "fuzzy" in weights:
+            query_grams = char_ngrams(norm_query)
+            # Thứ tự cố định (điểm sơ bộ, rồi book_id) để cùng truy vấn luôn cho cùng kết quả
+            rest = sorted(candidates.difference(shortlist), key=lambda b: (-prescore[b], b))
+            ordered = shortlist + rest
+            for b in ordered[self.fuzzy_candidates + self.overlap_candidates:]:
+                del signals[b]
+            for i, b in enumerate(ordered[:self.fuzzy_candidates + self.overlap_candidates]):
+                title = self.catalog.normalized_title(b)
+                if i < self.fuzzy_candidates:
+                    signals[b]["fuzzy"] = similarity(norm_query, title) / 100
+                else:
+                    grams = char_ngrams(title)
+                    signals[b]["fuzzy"] = len(query_grams & grams) / max(1, len(query_grams | grams))
+
+        results = []
+        for b, s in signals.items():
+            row = self.catalog.get(b)
+            if row is None:
+                continue
+            score = sum(w * s.get(name, 0.0) for name, w in weights.items())
+            results.append((row, score, s))
+        results.sort(key=lambda item: (-item[1], item[0][0]))
+        return results[:k]
+
+    def best_match(self, query: str, threshold: float) -> Optional[tuple]:
+        ranked = self.rank(query, k=1)
+        if ranked and ranked[0][1] >= threshold:
+            return ranked[0][0]
+        return None
@@ -0,0 +1,70 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+_registry: Dict[str, "LazyResource"] = {}
+
+
+class LazyResource:
+    """Create an expensive object (model, chain...) on first use.
+
+    Attribute access is forwarded to the underlying object, so a
+    ``LazyResource`` can stand in wherever the object itself was used
+    (``embed_model.encode(...)``, ``llm.invoke(...)``). Load time is recorded
+    for ``startup_report``.
+    """
+
+    def __init__(self, name: str, factory: Callable):
+        self.name = name
+        self._factory = factory
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+        _registry[name] = self
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    self._value = self._factory()
+                    self.load_seconds = time.perf_counter() - start
+                    self._loaded = True
+        return self._value
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self.get()(*args, **kwargs)
+
+    def __repr__(self):
+        state = f"loaded in {self.load_seconds:.3f}s" if self._loaded else "not loaded"
+        return f"<LazyResource {self.name}: {state}>"
+
+
+def warm_up(names: Iterable[str] = None) -> Dict[str, float]:
+    """Load the given resources (all registered ones by default) up front."""
+    names = list(names) if names is not None else list(_registry)
+    for name in names:
+        _registry[name].get()
+    return {name: _registry[name].load_seconds for name in names}
+
+
+def startup_report() -> Dict[str, Optional[float]]:
+    """Load time in seconds per component; None for components not loaded yet."""
+    return {name: res.load_seconds for name, res in _registry.items()}
+
+
+def format_startup_report() -> str:
+    lines = []
+    for name, seconds in startup_report().items():
+        lines.append(f"{name:<16} {'chưa nạp' if seconds is None else f'{seconds:.3f}s'}")
+    return "\n".join(lines)
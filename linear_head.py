@@ -0,0 +1,64 @@
+import json
+import os
+
+import numpy as np
+
+LINEAR_HEAD_PATH = "model/intent_head_1"
+
+
+class LinearHead:
+    """Intent classifier head as plain NumPy arrays: ``argmax(X @ W + b)``.
+
+    Stands in for both the XGBoost model and its LabelEncoder
+    (``predict`` + ``inverse_transform``). Stored as
+    ``<path>.weights.npy``, ``<path>.bias.npy`` and ``<path>.classes.json``;
+    the weight matrix is memory-mapped on load.
+    """
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, classes):
+        self.weights = weights          # (dim, n_classes)
+        self.bias = bias                # (n_classes,)
+        self.classes_ = np.asarray(classes)
+
+    @classmethod
+    def from_logistic(cls, model, classes) -> "LinearHead":
+        """Export a fitted sklearn LogisticRegression."""
+        coef = np.asarray(model.coef_, dtype=np.float32)
+        intercept = np.asarray(model.intercept_, dtype=np.float32)
+        if coef.shape[0] == 1:
+            # Nhị phân: softmax của [-z/2, z/2] bằng đúng sigmoid(z)
+            coef = np.vstack([-coef / 2, coef / 2])
+            intercept = np.array([-intercept[0] / 2, intercept[0] / 2], dtype=np.float32)
+        return cls(np.ascontiguousarray(coef.T), intercept, classes)
+
+    def decision_function(self, X) -> np.ndarray:
+        return np.asarray(X, dtype=np.float32) @ self.weights + self.bias
+
+    def predict_proba(self, X) -> np.ndarray:
+        z = self.decision_function(X)
+        z -= z.max(axis=1, keepdims=True)
+        np.exp(z, out=z)
+        z /= z.sum(axis=1, keepdims=True)
+        return z
+
+    def predict(self, X) -> np.ndarray:
+        return self.decision_function(X).argmax(axis=1)
+
+    def inverse_transform(self, y) -> np.ndarray:
+        return self.classes_[np.asarray(y)]
+
+    def save(self, path: str = LINEAR_HEAD_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.save(path + ".weights.npy", np.asarray(self.weights, dtype=np.float32))
+        np.save(path + ".bias.npy", np.asarray(self.bias, dtype=np.float32))
+        with open(path + ".classes.json", "w", encoding="utf-8") as f:
+            json.dump([str(c) for c in self.classes_], f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str = LINEAR_HEAD_PATH, mmap: bool = True) -> "LinearHead":
+        mode = "r" if mmap else None
+        weights = np.load(path + ".weights.npy", mmap_mode=mode)
+        bias = np.load(path + ".bias.npy")
+        with open(path + ".classes.json", encoding="utf-8") as f:
+            classes = json.load(f)
+        return cls(weights, bias, classes)
@@ -0,0 +1,72 @@
+import argparse
+import os
+
+from db_utils import get_connection
+from text_normalize import fold_title
+
+MIGRATION_FILE = os.path.join("mySQL_DB_file", "migrations", "001_title_norm.sql")
+BATCH_SIZE = 5000
+
+
+def existing_schema(cursor, table: str) -> tuple:
+    cursor.execute(f"SHOW COLUMNS FROM `{table}`")
+    columns = {row[0] for row in cursor.fetchall()}
+    cursor.execute(f"SHOW INDEX FROM `{table}`")
+    indexes = {row[2] for row in cursor.fetchall()}
+    return columns, indexes
+
+
+def apply_schema(conn, table: str = "books") -> None:
+    """Run the DDL of 001_title_norm.sql, skipping parts that already exist."""
+    cursor = conn.cursor()
+    columns, indexes = existing_schema(cursor, table)
+    if "title_norm" not in columns:
+        cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN `title_norm` varchar(255) NOT NULL DEFAULT '' AFTER `title`")
+    if "idx_books_title_norm" not in indexes:
+        cursor.execute(f"CREATE INDEX `idx_books_title_norm` ON `{table}` (`title_norm`(32))")
+    if "ft_books_title" not in indexes:
+        cursor.execute(f"ALTER TABLE `{table}` ADD FULLTEXT INDEX `ft_books_title` (`title`) WITH PARSER ngram")
+
+
+def insert_books(cursor, rows, table: str = "books") -> None:
+    """INSERT (title, author, price, stock, category) rows, writing title_norm when the column exists.
+
+    Books added after the backfill would otherwise keep title_norm = '' and be
+    invisible to the prefix lookup in title_lookup.
+    """
+    columns, _ = existing_schema(cursor, table)
+    if "title_norm" in columns:
+        cursor.executemany(
+            f"INSERT INTO `{table}` (title, title_norm, author, price, stock, category) VALUES (%s, %s, %s, %s, %s, %s)",
+            [(row[0], fold_title(row[0])) + tuple(row[1:]) for row in rows]
+        )
+    else:
+        cursor.executemany(
+            f"INSERT INTO `{table}` (title, author, price, stock, category) VALUES (%s, %s, %s, %s, %s)", rows
+        )
+
+
+def backfill(conn, table: str = "books", only_missing: bool = True) -> int:
+    """Fill title_norm in batches of BATCH_SIZE rows; returns rows updated."""
+    read = conn.cursor()
+    where = " WHERE title_norm = ''" if only_missing else ""
+    read.execute(f"SELECT book_id, title FROM `{table}`{where}")
+    rows = read.fetchall()
+    write = conn.cursor()
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        write.executemany(f"UPDATE `{table}` SET title_norm = %s WHERE book_id = %s",
+                          [(fold_title(title), book_id) for book_id, title in batch])
+        conn.commit()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Áp dụng {MIGRATION_FILE} và điền cột title_norm")
+    parser.add_argument("--all", action="store_true", help="tính lại title_norm cho mọi dòng")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    apply_schema(conn)
+    print(f"title_norm: {backfill(conn, only_missing=not args.all)} dòng đã cập nhật")
+    conn.close()
@@ -0,0 +1,13 @@
+-- Cột tên sách đã bỏ dấu + index cho tìm kiếm theo tên.
+-- Chạy sau bookstore.sql; cột title_norm được điền bởi migrate_title_norm.py
+-- (bỏ dấu tiếng Việt làm ở Python, MySQL không có hàm tương đương).
+
+ALTER TABLE `books`
+  ADD COLUMN `title_norm` varchar(255) NOT NULL DEFAULT '' AFTER `title`;
+
+-- Prefix index: đủ phân biệt tên sách, nhỏ hơn nhiều so với index cả cột
+CREATE INDEX `idx_books_title_norm` ON `books` (`title_norm`(32));
+
+-- FULLTEXT với ngram parser cho tìm kiếm chuỗi con (thay cho LIKE '%...%')
+ALTER TABLE `books`
+  ADD FULLTEXT INDEX `ft_books_title` (`title`) WITH PARSER ngram;
@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+
+# MiniLM xuất sang ONNX + lượng tử hóa int8 động, chạy bằng onnxruntime trên CPU.
+# Cần thêm: onnx, onnxruntime (chỉ khi chọn backend này).
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+ONNX_DIR = "model/minilm_onnx"
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+MAX_LENGTH = 128
+
+
+def export_onnx(model_name: str = MODEL_NAME, out_dir: str = ONNX_DIR, quantize: bool = True) -> str:
+    """Export the transformer to ``out_dir`` and optionally an int8 copy; returns the model path."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(out_dir)
+
+    fp32_path = os.path.join(out_dir, FP32_FILE)
+    sample = tokenizer(["xin chào"], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": {0: "batch", 1: "seq"},
+                          "attention_mask": {0: "batch", 1: "seq"},
+                          "last_hidden_state": {0: "batch", 1: "seq"}},
+            opset_version=14
+        )
+    if not quantize:
+        return fp32_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    int8_path = os.path.join(out_dir, INT8_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+class OnnxEmbedder:
+    """SentenceTransformer-compatible ``encode`` on an ONNX MiniLM (mean pooling)."""
+
+    def __init__(self, model_dir: str = ONNX_DIR, quantized: bool = True, threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        if not os.path.exists(path):
+            export_onnx(out_dir=model_dir, quantize=quantized)
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    def _encode_batch(self, texts: list) -> np.ndarray:
+        enc = self.tokenizer(texts, padding=True, truncation=True, max_length=MAX_LENGTH, return_tensors="np")
+        mask = enc["attention_mask"].astype(np.int64)
+        hidden = self.session.run(None, {"input_ids": enc["input_ids"].astype(np.int64),
+                                         "attention_mask": mask})[0]
+        # Mean pooling theo attention mask, giống pooling của sentence-transformers
+        weights = mask[:, :, None].astype(np.float32)
+        return (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences, batch_size: int = 64, convert_to_numpy: bool = True,
+               show_progress_bar: bool = False, normalize_embeddings: bool = False,
+               **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Sắp theo độ dài để padding trong mỗi batch ít nhất, rồi trả về đúng thứ tự
+        order = np.argsort([len(t) for t in texts])
+        out = [None] * len(texts)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            for i, vec in zip(idx, self._encode_batch([texts[i] for i in idx])):
+                out[i] = vec
+        result = np.vstack(out).astype(np.float32)
+        if normalize_embeddings:
+            result /= np.clip(np.linalg.norm(result, axis=1, keepdims=True), 1e-12, None)
+        return result[0] if single else result
@@ -0,0 +1,211 @@
+import csv
+import re
+import time
+
+VIETNAMESE_NUMBERS = {
+    "một": 1, "mốt": 1,
+    "hai": 2,
+    "ba": 3,
+    "bốn": 4, "tư": 4,
+    "năm": 5, "lăm": 5,
+    "sáu": 6,
+    "bảy": 7,
+    "tám": 8,
+    "chín": 9,
+    "mười": 10
+}
+
+_NUMBER = r"\d+|" + "|".join(sorted(VIETNAMESE_NUMBERS, key=len, reverse=True))
+_UNIT = r"cuốn|quyển|bản"
+
+# Một regex tổng hợp duy nhất, thứ tự nhánh quyết định độ ưu tiên của token
+TOKEN_SPEC = [
+    ("QUOTED", r"['\"“‘](?P<quoted>[^'\"”’]+)['\"”’]"),
+    ("PHONE_KW", r"\b(?:số điện thoại|sđt|sdt|đt|phone|liên hệ|liên lạc qua|liên lạc|gọi|số(?=\s*\+?\d(?:[\s.-]?\d){7}))\b:?"),
+    ("PHONE", r"\+?\d(?:[\s.-]?\d){7,13}"),
+    ("QTY", rf"\b(?P<qty>{_NUMBER})\s*(?:{_UNIT})\b"),
+    ("QTY_KW", r"\bsố lượng\b:?"),
+    ("ADDR_KW", r"\b(?:địa chỉ giao hàng|địa chỉ|ship tới|ship đến|giao tới|giao đến|giao tại|giao về|tới|đến|giao|về|ở)\b:?"),
+    ("ORDER_VERB", r"\b(?:mua|đặt|lấy|order|gửi)\b"),
+    ("FILLER", r"\b(?:cho|tôi|muốn|giúp|làm ơn|hãy|xin|cần|mình|em|sách|(?:cuốn|quyển|bản)(?=\s))\b"),
+    ("NUMBER", rf"\b(?:{_NUMBER})\b"),
+    ("AND", r"\b(?:và|với)\b"),
+    ("SEP", r"[,;]"),
+    ("WORD", r"[^\s,;]+"),
+]
+TOKEN_RE = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in TOKEN_SPEC),
+                      re.IGNORECASE)
+QUANTITY_RE = re.compile(rf"\b({_NUMBER})\s*(?:{_UNIT})\b", re.IGNORECASE)
+PHONE_CLEAN_RE = re.compile(r"[\s.-]")
+TRAILING_CONNECTOR_RE = re.compile(r"\s+(?:và|với)$", re.IGNORECASE)
+TRIM_CHARS = " ,.;:!?'\"“”‘’"
+
+
+def _to_int(word: str) -> int:
+    return int(word) if word.isdigit() else VIETNAMESE_NUMBERS[word.lower()]
+
+
+def normalize_quantity(text: str) -> int:
+    """Quantity written as '<số|chữ số> cuốn/quyển/bản', defaulting to 1."""
+    m = QUANTITY_RE.search(text)
+    return _to_int(m.group(1)) if m else 1
+
+
+def _item_title(user_input: str, item: dict) -> str:
+    if item["quoted"]:
+        return item["quoted"].strip()
+    if item["span"]:
+        title = user_input[item["span"][0]:item["span"][1]].strip(TRIM_CHARS)
+        return TRAILING_CONNECTOR_RE.sub("", title)
+    return ""
+
+
+def extract_order_entities(user_input: str) -> dict:
+    """Regex extraction of the ordered items, address and phone.
+
+    Walks the tokens of ``TOKEN_RE`` once: keywords switch the field being
+    collected, and title/address keep the original text between their first
+    and last token. A quoted span always wins as the title of its item.
+    'và'/'với' or ',' followed by a new quantity starts another item, so
+    '2 Naruto tập 20 và 1 One Piece tập 10' gives two items;
+    ``book_title``/``quantity`` mirror the first one.
+    """
+    items = [{"quantity": None, "span": None, "quoted": None}]
+    addr_span = None
+    phone = None
+    field = None           # "title" | "address" | "phone" | "quantity" | None
+    after_verb = False
+    boundary = None        # "and" | "sep" khi token trước có thể là ranh giới giữa hai món
+    cut = None             # cuối tên sách trước 'và/với', dùng khi tách món
+
+    for m in TOKEN_RE.finditer(user_input):
+        kind = m.lastgroup
+        item = items[-1]
+        titled = bool(item["span"] or item["quoted"])
+        at_boundary, boundary = boundary, None
+        # Ranh giới + số lượng / tên trong ngoặc (hoặc tên mới sau 'và') -> món mới
+        if at_boundary and field != "address" and (
+                kind in ("QTY", "NUMBER", "QUOTED") or (kind == "WORD" and at_boundary == "and" and cut is None)):
+            if at_boundary == "and" and cut is not None:
+                item["span"][1] = cut
+            item = {"quantity": None, "span": None, "quoted": None}
+            items.append(item)
+            titled = False
+            field = None
+        cut = None
+
+        if kind == "QUOTED":
+            item["quoted"] = item["quoted"] or m.group("quoted")
+            field = None
+        elif kind == "PHONE":
+            phone = phone or PHONE_CLEAN_RE.sub("", m.group())
+            field = None
+        elif kind == "PHONE_KW":
+            field = "phone"
+        elif kind == "QTY":
+            if titled and item["quantity"] is not None and field != "address":
+                item = {"quantity": None, "span": None, "quoted": None}
+                items.append(item)
+            if item["quantity"] is None:
+                item["quantity"] = _to_int(m.group("qty"))
+            after_verb = True
+            if field != "address":
+                field = None
+        elif kind == "QTY_KW":
+            field = "quantity"
+        elif kind == "ADDR_KW":
+            if addr_span is None:
+                field = "address"
+            elif field == "address":
+                addr_span[1] = m.end()
+        elif kind in ("ORDER_VERB", "FILLER"):
+            after_verb = after_verb or kind == "ORDER_VERB"
+            if field == "title":
+                field = None
+            elif field == "address" and addr_span:
+                addr_span[1] = m.end()
+        elif kind == "NUMBER":
+            if field == "quantity" or (field == "phone" and len(m.group()) < 5):
+                if item["quantity"] is None:
+                    item["quantity"] = _to_int(m.group())
+                field = None
+            elif field == "phone":
+                phone = phone or m.group()
+                field = None
+            elif field == "title":
+                item["span"][1] = m.end()
+            elif field == "address":
+                if addr_span is None:
+                    addr_span = [m.start(), m.end()]
+                else:
+                    addr_span[1] = m.end()
+            elif (after_verb or len(items) > 1) and not titled and item["quantity"] is None:
+                item["quantity"] = _to_int(m.group())
+            elif not titled:
+                item["span"] = [m.start(), m.end()]
+                field = "title"
+        elif kind == "SEP":
+            if field == "title":
+                field = None
+            if titled and field is None:
+                boundary = "sep"
+        elif kind == "AND" and field != "address" and (field == "title" or titled):
+            # 'và' có thể nằm trong tên ('Chiến tranh và hòa bình'): tạm nối vào tên,
+            # token sau mới quyết định có tách món hay không
+            if field == "title":
+                cut = item["span"][1]
+                item["span"][1] = m.end()
+            boundary = "and"
+        else:  # WORD (hoặc 'và/với' ngoài tên sách)
+            if field == "address":
+                if addr_span is None:
+                    addr_span = [m.start(), m.end()]
+                else:
+                    addr_span[1] = m.end()
+            elif field == "title":
+                item["span"][1] = m.end()
+            elif not titled and field is None:
+                item["span"] = [m.start(), m.end()]
+                field = "title"
+
+    # 'is None' chứ không phải 'or 1': số lượng 0 phải tới place_order để bị từ chối
+    parsed = [{"book_title": _item_title(user_input, item),
+               "quantity": 1 if item["quantity"] is None else item["quantity"]}
+              for item in items]
+    parsed = [item for item in parsed if item["book_title"]] or \
+        [{"book_title": "Unknown", "quantity": 1 if items[0]["quantity"] is None else items[0]["quantity"]}]
+    address = user_input[addr_span[0]:addr_span[1]].strip(TRIM_CHARS) if addr_span else ""
+
+    return {
+        "book_title": parsed[0]["book_title"],
+        "quantity": parsed[0]["quantity"],
+        "items": parsed,
+        "address": address or "Unknown",
+        "phone": phone or "Unknown"
+    }
+
+
+def benchmark(path: str = "bookstore_requests_balanced.csv", repeat: int = 20) -> None:
+    """Per-call cost of the engine on the place_order sentences of ``path``."""
+    with open(path, encoding="utf-8") as f:
+        texts = [row["text"] for row in csv.DictReader(f) if row["label"].strip() == "place_order"]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            extract_order_entities(text)
+    elapsed = time.perf_counter() - start
+    calls = repeat * len(texts)
+    print(f"{calls} calls, {elapsed / calls * 1e6:.1f} µs/call")
+
+if __name__ == "__main__":
+    for sample in [
+        "Tôi muốn mua 2 quyển Naruto tập 20, giao tới Hà Nội, số 0909123456",
+        "Đặt 2 quyển 'Sapiens: Lược Sử Loài Người' giúp tôi, ship tới 99 Phan Chu Trinh, Huế, liên lạc qua 0912345678.",
+        "Tôi muốn đặt một cuốn Không gia đình, giao đến ngõ 1 phường Đề Thám, sdt 23529341",
+        "Đặt mua Không gia đình, số lượng 2, địa chỉ Hà Nội",
+        "Mua 2 Naruto tập 20 và 1 One Piece tập 10, giao tới Hà Nội, sdt 0909123456",
+        "Lấy 'Đắc Nhân Tâm' 2 cuốn với 'Nhà Giả Kim' 1 cuốn, ship tới 12 Lê Lợi, Huế",
+    ]:
+        print(sample, "->", extract_order_entities(sample))
+    benchmark()
@@ -0,0 +1,189 @@
+import os
+import threading
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # faiss là tuỳ chọn, không có thì dùng NumPy
+    faiss = None
+
+EMBEDDINGS_PATH = "model/book_embeddings.npy"
+BLOCK_SIZE = 16384
+HNSW_NEIGHBORS = 32
+
+
+def book_text(row: tuple) -> str:
+    """Text embedded for a catalog row: title, author and category."""
+    _, title, author, _, _, category = row
+    return " | ".join(str(x).strip() for x in (title, author, category) if x)
+
+
+def text_hash(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def ids_path(embeddings_path: str) -> str:
+    root, ext = os.path.splitext(embeddings_path)
+    return f"{root}_ids{ext}"
+
+
+def hashes_path(embeddings_path: str) -> str:
+    root, ext = os.path.splitext(embeddings_path)
+    return f"{root}_hashes{ext}"
+
+
+def blocked_topk(matrix: np.ndarray, query: np.ndarray, k: int,
+                 block_size: int = BLOCK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k inner product over a (possibly memory-mapped) matrix.
+
+    Scores one block of rows at a time so only ``block_size`` rows are paged in
+    and multiplied at once; the running top-k is merged after every block.
+    """
+    best_idx = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float32)
+    for start in range(0, matrix.shape[0], block_size):
+        scores = np.asarray(matrix[start:start + block_size]) @ query
+        if scores.shape[0] > k:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(scores.shape[0])
+        best_idx = np.concatenate([best_idx, top + start])
+        best_scores = np.concatenate([best_scores, scores[top]])
+        if best_scores.shape[0] > k:
+            keep = np.argpartition(best_scores, -k)[-k:]
+            best_idx, best_scores = best_idx[keep], best_scores[keep]
+    order = np.argsort(-best_scores)
+    return best_idx[order], best_scores[order]
+
+
+class SemanticIndex:
+    """Top-k semantic search over title/author/category embeddings.
+
+    Embeddings are L2-normalized, persisted to a ``.npy`` file next to the
+    matching book_ids and memory-mapped on load, so inner product equals
+    cosine similarity. Rebuilt when the catalog version moves: new books are
+    appended and books whose text changed are re-encoded in place. Uses a FAISS HNSW index when faiss is installed,
+    otherwise a blocked NumPy matmul.
+    """
+
+    def __init__(self, embed_model, catalog, path: str = EMBEDDINGS_PATH):
+        self.embed_model = embed_model
+        self.catalog = catalog
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = None  # (matrix, ids, faiss_index), thay cả bộ một lần
+        self._built_version = -1
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        emb = self.embed_model.encode(texts, batch_size=64, convert_to_numpy=True,
+                                      normalize_embeddings=True)
+        return np.asarray(emb, dtype=np.float32)
+
+    def _save(self, matrix: np.ndarray, ids: np.ndarray, hashes: np.ndarray) -> None:
+        # Ghi ra file tạm rồi os.replace: matrix đang mmap trong _state vẫn trỏ vào file cũ,
+        # ghi đè trực tiếp sẽ làm luồng đang search đọc phải file bị cắt (SIGBUS)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        for path, data in ((self.path, matrix), (ids_path(self.path), ids), (hashes_path(self.path), hashes)):
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, data)
+            os.replace(tmp, path)
+
+    def build(self) -> None:
+        """Encode books that are new or whose text changed, then reload the matrix."""
+        self.catalog.ensure_loaded()
+        version = self.catalog.version
+        rows = self.catalog.rows()
+        if os.path.exists(self.path) and os.path.exists(ids_path(self.path)):
+            matrix = np.load(self.path, mmap_mode="r")  # chỉ đọc cả file khi thật sự phải ghi
+            ids = np.load(ids_path(self.path))
+            if os.path.exists(hashes_path(self.path)):
+                hashes = np.load(hashes_path(self.path))
+            else:  # file cũ chưa có hash: mã hóa lại toàn bộ một lần
+                hashes = np.zeros(ids.shape[0], dtype=np.uint32)
+        else:
+            matrix, ids = None, np.empty(0, dtype=np.int64)
+            hashes = np.empty(0, dtype=np.uint32)
+
+        position = {book_id: i for i, book_id in enumerate(ids.tolist())}
+        texts = [book_text(r) for r in rows]
+        row_hashes = [text_hash(t) for t in texts]
+        stale = [i for i, (r, h) in enumerate(zip(rows, row_hashes))
+                 if r[0] not in position or hashes[position[r[0]]] != h]
+        appended = 0
+        if stale:
+            new = self._encode([texts[i] for i in stale])
+            added = [j for j, i in enumerate(stale) if rows[i][0] not in position]
+            if len(added) < len(stale):
+                # sách đổi tên/tác giả/thể loại: ghi đè vector cũ trên bản sao ghi được
+                matrix = np.array(matrix)
+                for j, i in enumerate(stale):
+                    pos = position.get(rows[i][0])
+                    if pos is not None:
+                        matrix[pos] = new[j]
+                        hashes[pos] = row_hashes[i]
+                appended = None  # vector giữa ma trận đổi: phải dựng lại index FAISS
+            else:
+                appended = len(added)
+            if added:
+                matrix = new[added] if matrix is None else np.vstack([matrix, new[added]])
+                ids = np.concatenate([ids, np.array([rows[stale[j]][0] for j in added], dtype=np.int64)])
+                hashes = np.concatenate([hashes, np.array([row_hashes[stale[j]] for j in added], dtype=np.uint32)])
+            self._save(matrix, ids, hashes)
+        self._open(appended)
+        self._built_version = version
+
+    def _open(self, appended: int = None) -> None:
+        """Map the saved matrix; ``appended`` new rows at the end reuse the current FAISS graph."""
+        matrix = np.load(self.path, mmap_mode="r")
+        ids = np.load(ids_path(self.path))
+        faiss_index = None
+        if faiss is not None and matrix.shape[0]:
+            old = self._state[2] if self._state is not None else None
+            if old is not None and appended is not None and old.ntotal + appended == matrix.shape[0]:
+                # Chỉ có sách mới nối vào cuối: thêm vector vào bản sao của graph cũ (copy bộ nhớ)
+                # thay vì dựng lại HNSW; bản cũ vẫn phục vụ các luồng đang search
+                faiss_index = faiss.clone_index(old) if appended else old
+                if appended:
+                    faiss_index.add(np.ascontiguousarray(matrix[-appended:]))
+            else:
+                faiss_index = faiss.IndexHNSWFlat(matrix.shape[1], HNSW_NEIGHBORS,
+                                                  faiss.METRIC_INNER_PRODUCT)
+                faiss_index.add(np.ascontiguousarray(matrix))
+        self._state = (matrix, ids, faiss_index)
+
+    def _stale(self) -> bool:
+        return self._state is None or self._built_version != self.catalog.version
+
+    def ensure_ready(self) -> None:
+        self.catalog.ensure_loaded()
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    self.build()
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[tuple, float]]:
+        """Catalog rows ranked by cosine similarity to ``query``."""
+        self.ensure_ready()
+        matrix, ids, faiss_index = self._state
+        if not ids.shape[0]:
+            return []
+        q = self._encode([query])[0]
+        k = min(k, ids.shape[0])
+        if faiss_index is not None:
+            scores, idx = faiss_index.search(q[None, :], k)
+            scores, idx = scores[0], idx[0]
+        else:
+            idx, scores = blocked_topk(matrix, q, k)
+
+        results = []
+        for i, score in zip(idx, scores):
+            if i < 0:
+                continue
+            row = self.catalog.get(int(ids[i]))
+            if row is not None:
+                results.append((row, float(score)))
+        return results
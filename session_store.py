@@ -0,0 +1,159 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List
+
+SESSION_TTL = 1800          # giây không hoạt động trước khi phiên hết hạn
+MAX_SESSIONS = 10000
+MAX_PENDING = 20            # đơn chờ tối đa mỗi phiên, vượt thì bỏ đơn cũ nhất
+
+
+class InMemorySessionStore:
+    """Pending orders per session, with sliding TTL, a session cap and a per-session order cap.
+
+    Sessions are kept in an OrderedDict in last-access order, so lookups are
+    O(1) and expired or least recently used sessions are always at the front
+    and evicted in amortized O(1).
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS,
+                 max_pending: int = MAX_PENDING):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_pending = max_pending
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            session_id, (expires_at, _) = next(iter(self._sessions.items()))
+            if expires_at >= now and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def _touch(self, session_id: str, orders: list, now: float) -> None:
+        self._sessions[session_id] = (now + self.ttl, orders)
+        self._sessions.move_to_end(session_id)
+
+    def get_pending(self, session_id: str) -> List[dict]:
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            self._touch(session_id, entry[1], now)
+            return list(entry[1])
+
+    def add_pending(self, session_id: str, order: dict) -> int:
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            orders = entry[1] if entry is not None and entry[0] >= now else []
+            orders.append(order)
+            del orders[:-self.max_pending]
+            self._touch(session_id, orders, now)
+            self._evict(now)
+            return len(orders)
+
+    def pop_pending(self, session_id: str) -> List[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is None or entry[0] < now:
+                return []
+            return entry[1]
+
+
+class SQLiteSessionStore:
+    """Same interface as InMemorySessionStore, persisted in a SQLite file."""
+
+    def __init__(self, path: str, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS,
+                 max_pending: int = MAX_PENDING):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions "
+            "(session_id TEXT PRIMARY KEY, orders TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+        self._db.commit()
+        # Đếm phiên trong bộ nhớ để mỗi lần ghi không phải COUNT(*) / quét cả bảng
+        self._count = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _evict(self, now: float) -> None:
+        # Phiên hết hạn: đi theo index expires_at, chỉ chạm các dòng bị xóa
+        self._count -= self._db.execute("DELETE FROM sessions WHERE expires_at < ?", (now,)).rowcount
+        if self._count > self.max_sessions:
+            # Vượt trần: bỏ các phiên cũ nhất, cũng theo index expires_at
+            self._count -= self._db.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                "SELECT session_id FROM sessions ORDER BY expires_at LIMIT ?)",
+                (self._count - self.max_sessions,)
+            ).rowcount
+
+    def _load(self, session_id: str, now: float) -> list:
+        row = self._db.execute(
+            "SELECT orders FROM sessions WHERE session_id = ? AND expires_at >= ?",
+            (session_id, now)
+        ).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def _save(self, session_id: str, orders: list, now: float) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, orders, expires_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(orders, ensure_ascii=False), now + self.ttl)
+        )
+
+    def get_pending(self, session_id: str) -> List[dict]:
+        now = time.time()
+        with self._lock:
+            orders = self._load(session_id, now)
+            if orders:
+                self._db.execute("UPDATE sessions SET expires_at = ? WHERE session_id = ?",
+                                 (now + self.ttl, session_id))
+                self._db.commit()
+            return orders
+
+    def add_pending(self, session_id: str, order: dict) -> int:
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            orders = self._load(session_id, now)
+            if not orders:  # đã bỏ phiên hết hạn ở trên, nên không có dòng cũ nào bị ghi đè
+                self._count += 1
+            orders.append(order)
+            del orders[:-self.max_pending]
+            self._save(session_id, orders, now)
+            if self._count > self.max_sessions:
+                self._evict(now)
+            self._db.commit()
+            return len(orders)
+
+    def pop_pending(self, session_id: str) -> List[dict]:
+        now = time.time()
+        with self._lock:
+            orders = self._load(session_id, now)
+            self._count -= self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount
+            self._db.commit()
+            return orders
+
+
+def create_session_store(backend: str = "memory", path: str = None, **kwargs):
+    if backend == "memory":
+        return InMemorySessionStore(**kwargs)
+    if backend == "sqlite":
+        return SQLiteSessionStore(path or "sessions.sqlite3", **kwargs)
+    raise ValueError(f"Unknown session backend: {backend}")
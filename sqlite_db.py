@@ -0,0 +1,137 @@
+import re
+import sqlite3
+from functools import lru_cache
+
+# SQLite đứng thay MySQL khi benchmark/kiểm thử không có server: cùng bảng books/orders,
+# cùng API connection/cursor mà Chatbot_demo và db_utils đang dùng (paramstyle %s)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    book_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    author TEXT,
+    price REAL,
+    stock INTEGER,
+    category TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_books_title ON books (title);
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_name TEXT NOT NULL,
+    phone TEXT,
+    address TEXT,
+    book_id INTEGER REFERENCES books (book_id),
+    quantity INTEGER,
+    status TEXT DEFAULT 'pending'
+);
+CREATE INDEX IF NOT EXISTS idx_orders_book_id ON orders (book_id);
+"""
+INSERT_BATCH = 10000
+
+_LIKE_RE = re.compile(r"\bLIKE\s+\?", re.IGNORECASE)
+_FOR_UPDATE_RE = re.compile(r"\s+FOR\s+UPDATE\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def translate(query: str) -> str:
+    """MySQL query -> SQLite: ``%s`` -> ``?``, backslash LIKE escapes, no ``FOR UPDATE``."""
+    query = query.replace("%s", "?")
+    query = _LIKE_RE.sub(r"LIKE ? ESCAPE '\\'", query)
+    # SQLite khóa cả file khi ghi (BEGIN IMMEDIATE), không có khóa dòng
+    return _FOR_UPDATE_RE.sub("", query)
+
+
+class SQLiteCursor:
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool = False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self) -> int:
+        return self._cursor.lastrowid
+
+    def execute(self, query: str, params=()):
+        self._cursor.execute(translate(query), tuple(params or ()))
+
+    def executemany(self, query: str, seq_params):
+        self._cursor.executemany(translate(query), seq_params)
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip((d[0] for d in self._cursor.description), row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self) -> list:
+        return [self._row(r) for r in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """The subset of mysql.connector's connection API used in this project."""
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        # isolation_level=None: tự quản lý transaction như autocommit=False của MySQL
+        self._db = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+
+    def cursor(self, dictionary: bool = False, **kwargs) -> SQLiteCursor:
+        return SQLiteCursor(self._db.cursor(), dictionary)
+
+    def start_transaction(self):
+        self._db.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        if self._db.in_transaction:
+            self._db.execute("COMMIT")
+
+    def rollback(self):
+        if self._db.in_transaction:
+            self._db.execute("ROLLBACK")
+
+    def ping(self, reconnect: bool = True, attempts: int = 1, delay: int = 0):
+        self._db.execute("SELECT 1")
+
+    def close(self):
+        self._db.close()
+
+
+def create_database(path: str, books=()) -> int:
+    """Create the schema at ``path`` and bulk insert ``books``; returns rows inserted."""
+    conn = SQLiteConnection(path)
+    conn._db.executescript(SCHEMA)
+    cursor = conn.cursor()
+    inserted = 0
+    batch = []
+    for row in books:
+        batch.append(row)
+        if len(batch) == INSERT_BATCH:
+            inserted += _insert_books(conn, cursor, batch)
+            batch = []
+    if batch:
+        inserted += _insert_books(conn, cursor, batch)
+    conn.close()
+    return inserted
+
+
+def _insert_books(conn, cursor, batch) -> int:
+    conn.start_transaction()
+    cursor.executemany(
+        "INSERT INTO books (title, author, price, stock, category) VALUES (%s, %s, %s, %s, %s)", batch
+    )
+    conn.commit()
+    return len(batch)
+
+
+def connect_factory(path: str):
+    """``connect`` callable for ``db_utils.configure_pool``."""
+    return lambda: SQLiteConnection(path)
@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Thời gian từng bước của một lượt chat, dạng histogram (Prometheus text hoặc JSON).
+# Tắt mặc định: span() khi tắt trả về một object dùng chung, không đo gì.
+METRICS_ENABLED = os.environ.get("BOOKSTORE_METRICS", "0") == "1"
+METRIC_NAME = "bookstore_stage_seconds"
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGES = ("regex_routing", "embedding", "xgboost_predict", "llm_extraction",
+          "db_query", "fuzzy_match", "response_formatting", "turn")
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "total", "count", "max", "_lock")
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # ô cuối là +Inf
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        i = bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.total += seconds
+            self.count += 1
+            if seconds > self.max:
+                self.max = seconds
+
+    def cumulative(self) -> list:
+        out, running = [], 0
+        for c in self.counts:
+            running += c
+            out.append(running)
+        return out
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, cum in zip(self.bounds, self.cumulative()):
+            if cum >= rank:
+                return bound
+        return self.max
+
+
+class _Span:
+    __slots__ = ("_metrics", "_stage", "_start")
+
+    def __init__(self, metrics, stage: str):
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics.observe(self._stage, time.perf_counter() - self._start)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class StageMetrics:
+    """Per-stage latency histograms fed by ``with metrics.span("db_query"): ...``."""
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, bounds=BUCKETS):
+        self.enabled = enabled
+        self.bounds = bounds
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage: str):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, stage)
+
+    def span_iter(self, stage: str, iterable):
+        """Yield from ``iterable``, timing only the time spent producing items.
+
+        Time the consumer holds each item (e.g. a UI rendering streamed
+        tokens) is not counted, unlike ``with span(...)`` around ``yield``.
+        """
+        if not self.enabled:
+            return iterable
+        return self._span_iter(stage, iterable)
+
+    def _span_iter(self, stage: str, iterable):
+        elapsed = 0.0
+        start = time.perf_counter()
+        try:
+            for item in iterable:
+                elapsed += time.perf_counter() - start
+                yield item
+                start = time.perf_counter()
+            elapsed += time.perf_counter() - start
+        finally:
+            self.observe(stage, elapsed)
+
+    def span_aiter(self, stage: str, aiterable):
+        """Async version of ``span_iter``."""
+        if not self.enabled:
+            return aiterable
+        return self._span_aiter(stage, aiterable)
+
+    async def _span_aiter(self, stage: str, aiterable):
+        elapsed = 0.0
+        start = time.perf_counter()
+        try:
+            async for item in aiterable:
+                elapsed += time.perf_counter() - start
+                yield item
+                start = time.perf_counter()
+            elapsed += time.perf_counter() - start
+        finally:
+            self.observe(stage, elapsed)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        hist = self._histograms.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(stage, Histogram(self.bounds))
+        hist.observe(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms = {}
+
+    def to_dict(self) -> dict:
+        out = {}
+        for stage, h in sorted(self._histograms.items()):
+            buckets = {str(b): c for b, c in zip(h.bounds, h.cumulative())}
+            buckets["+Inf"] = h.count
+            out[stage] = {
+                "count": h.count,
+                "sum_seconds": h.total,
+                "mean_ms": h.total / h.count * 1000 if h.count else 0.0,
+                "p50_ms_le": h.quantile(0.5) * 1000,
+                "p95_ms_le": h.quantile(0.95) * 1000,
+                "p99_ms_le": h.quantile(0.99) * 1000,
+                "max_ms": h.max * 1000,
+                "buckets": buckets
+            }
+        return out
+
+    def to_prometheus(self) -> str:
+        lines = [f"# HELP {METRIC_NAME} Time spent per chat pipeline stage.",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        for stage, h in sorted(self._histograms.items()):
+            for bound, cum in zip(h.bounds, h.cumulative()):
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound}"}} {cum}')
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {h.total}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        """Write ``path`` as Prometheus text (``.prom``/``.txt``) or JSON."""
+        if path.endswith((".prom", ".txt")):
+            data = self.to_prometheus()
+        else:
+            data = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+metrics = StageMetrics()
+
+
+def span(stage: str):
+    return metrics.span(stage)
+
+
+def span_iter(stage: str, iterable):
+    return metrics.span_iter(stage, iterable)
+
+
+def span_aiter(stage: str, aiterable):
+    return metrics.span_aiter(stage, aiterable)
@@ -0,0 +1,105 @@
+import argparse
+import csv
+import random
+from typing import Iterator, List
+
+# Catalog và câu hỏi giả lập để benchmark với dữ liệu lớn (bookstore.sql chỉ có ~30 sách)
+SERIES = ["Naruto", "One Piece", "Doraemon", "Conan", "Harry Potter", "Sherlock Holmes",
+          "Dế Mèn", "Không Gia Đình", "Nhà Giả Kim", "Đắc Nhân Tâm", "Hoàng Tử Bé", "Totto-chan"]
+WORDS = ["mùa", "hạ", "thơ", "tuyển", "tập", "người", "đàn", "ông", "bà", "sao", "hỏa", "kim",
+         "tuổi", "trẻ", "đáng", "giá", "bao", "nhiêu", "lịch", "sử", "loài", "phiêu", "lưu", "ký",
+         "bên", "cửa", "sổ", "thành", "phố", "biển", "rừng", "núi", "ánh", "trăng", "gió", "mưa"]
+AUTHORS = ["Masashi Kishimoto", "Eiichiro Oda", "Fujiko F. Fujio", "Gosho Aoyama", "J.K. Rowling",
+           "Arthur Conan Doyle", "Tô Hoài", "Hector Malot", "Paulo Coelho", "Dale Carnegie",
+           "Nguyễn Nhật Ánh", "Xuân Quỳnh", "Yuval Noah Harari", "Nam Cao"]
+CATEGORIES = ["comic", "novel", "thơ", "self-help", "history", "science"]
+CITIES = ["Hà Nội", "TP HCM", "Đà Nẵng", "Huế", "Quảng Ninh", "Cần Thơ", "Hải Phòng"]
+CATALOG_SIZES = (10_000, 100_000, 1_000_000)
+
+ORDER_TEMPLATES = [
+    "Tôi muốn mua {qty} quyển {title}, giao tới {city}, số {phone}",
+    "Đặt mua sách {title}, số điện thoại {phone}, giao tại {city}",
+    "Mua {qty} cuốn {title}, giao {city}",
+    "Đặt mua {title}, số lượng {qty}, địa chỉ {city}",
+    "Tôi muốn đặt {title}",
+    "Ship {qty} cuốn {title} tới {city}, sdt {phone}",
+]
+DETAIL_TEMPLATES = [
+    "Có sách {title} không?",
+    "Cho tôi biết giá của {title}",
+    "Sách {title} giá bao nhiêu?",
+    "Thông tin {title}",
+    "Tác giả {title} là ai?",
+    "{title} còn bao nhiêu quyển?",
+]
+CUSTOMER_NAMES = ["Nguyễn Văn An", "Trần Thị Bình", "Lê Minh", "Phạm Hoa", "Hoàng Nam"]
+
+
+def synthetic_titles(n: int, seed: int = 42) -> Iterator[str]:
+    rng = random.Random(seed)
+    for i in range(n):
+        if rng.random() < 0.3:
+            yield f"{rng.choice(SERIES)} tập {rng.randint(1, 120)}"
+        else:
+            yield " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).capitalize() + f" {i}"
+
+
+def synthetic_books(n: int, seed: int = 42) -> Iterator[tuple]:
+    """(title, author, price, stock, category) rows, same columns as ``books``."""
+    rng = random.Random(seed + 1)
+    for title in synthetic_titles(n, seed):
+        yield (title, rng.choice(AUTHORS), rng.randint(10, 500) * 1000,
+               rng.randint(0, 200), rng.choice(CATEGORIES))
+
+
+def perturb_title(title: str, rng: random.Random) -> str:
+    # Khách gõ thiếu dấu / sai chính tả / chỉ một phần tên
+    r = rng.random()
+    if r < 0.2:
+        return title.lower()
+    if r < 0.3 and len(title) > 6:
+        i = rng.randrange(1, len(title) - 1)
+        return title[:i] + title[i + 1:]
+    if r < 0.4:
+        return " ".join(title.split()[:max(2, len(title.split()) - 1)])
+    return title
+
+
+def synthetic_utterances(titles: List[str], n: int, order_ratio: float = 0.5,
+                         seed: int = 7) -> Iterator[dict]:
+    """Chat turns ``{"text", "label", "title"}`` sampled over ``titles``."""
+    rng = random.Random(seed)
+    for _ in range(n):
+        title = rng.choice(titles)
+        shown = perturb_title(title, rng)
+        if rng.random() < order_ratio:
+            text = rng.choice(ORDER_TEMPLATES).format(
+                title=shown, qty=rng.randint(1, 3), city=rng.choice(CITIES),
+                phone="09" + "".join(rng.choice("0123456789") for _ in range(8)))
+            yield {"text": text, "label": "place_order", "title": title}
+        else:
+            yield {"text": rng.choice(DETAIL_TEMPLATES).format(title=shown),
+                   "label": "detail_book", "title": title}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sinh catalog và câu hỏi giả lập")
+    parser.add_argument("--books", type=int, default=CATALOG_SIZES[0])
+    parser.add_argument("--utterances", type=int, default=5000)
+    parser.add_argument("--catalog-out", default="synthetic_books.csv")
+    parser.add_argument("--utterances-out", default="synthetic_utterances.csv")
+    args = parser.parse_args()
+
+    titles = []
+    with open(args.catalog_out, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["title", "author", "price", "stock", "category"])
+        for row in synthetic_books(args.books):
+            titles.append(row[0])
+            writer.writerow(row)
+    with open(args.utterances_out, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["text", "label", "title"])
+        writer.writeheader()
+        writer.writerows(synthetic_utterances(titles, args.utterances))
+    print(f"Đã lưu {args.books} sách vào {args.catalog_out}, "
+          f"{args.utterances} câu vào {args.utterances_out}")
@@ -0,0 +1,48 @@
+import re
+import unicodedata
+from typing import Iterable, List
+
+# Khóa chuẩn hóa dùng chung cho mọi bộ so khớp tên sách / câu người dùng:
+# - clean_text: NFC + gộp khoảng trắng, giữ hoa/thường (chuẩn hóa câu vào một lần mỗi lượt)
+# - normalize_text: clean_text + chữ thường (khóa cache intent)
+# - fold_title: bỏ dấu, đ -> d, gộp dấu câu/khoảng trắng (khóa tìm sách, cột title_norm)
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+
+def _build_fold_table() -> dict:
+    # Bảng translate dựng một lần: chữ hoa ASCII -> thường, chữ Latin có dấu
+    # (dựng sẵn) -> chữ gốc, dấu kết hợp (chuỗi NFD) -> bỏ
+    table = {ord(c): c.lower() for c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"}
+    for cp in list(range(0x00C0, 0x0250)) + list(range(0x1E00, 0x1F00)):
+        ch = chr(cp)
+        base = "".join(c for c in unicodedata.normalize("NFD", ch.lower()) if not unicodedata.combining(c))
+        if base != ch and base.isascii():
+            table[cp] = base
+    for cp in range(0x0300, 0x0370):
+        table[cp] = None
+    table[ord("đ")] = table[ord("Đ")] = "d"
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+
+
+def clean_text(text: str) -> str:
+    """Unicode NFC with whitespace collapsed; case and accents are kept."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def normalize_text(text: str) -> str:
+    """Intent/cache key: ``clean_text`` lowercased."""
+    return clean_text(text).lower()
+
+
+def fold_title(text: str) -> str:
+    """Accent-folded search key: 'Không Gia Đình' -> 'khong gia dinh'."""
+    return _NON_ALNUM_RE.sub(" ", (text or "").translate(_FOLD_TABLE)).strip()
+
+
+def fold_titles(texts: Iterable[str]) -> List[str]:
+    """``fold_title`` for a whole batch, e.g. every title of the catalog at load."""
+    translate, sub = str.translate, _NON_ALNUM_RE.sub
+    return [sub(" ", translate(t or "", _FOLD_TABLE)).strip() for t in texts]
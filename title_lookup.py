@@ -0,0 +1,137 @@
+import threading
+
+from text_normalize import fold_title
+
+MAX_RESULTS = 20
+
+
+def escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class TitleLookup:
+    """Title search through the best index available on ``books``.
+
+    Checks the schema once: with the title_norm prefix index (migration
+    001_title_norm.sql) an accent-folded prefix match is tried first; with
+    the ngram FULLTEXT index substring search uses MATCH ... AGAINST;
+    otherwise it falls back to the plain ``LIKE '%...%'`` scan.
+    """
+
+    def __init__(self, connect, table: str = "books"):
+        self._connect = connect
+        self.table = table
+        self._strategies = None
+        self._lock = threading.Lock()
+
+    def strategies(self, cursor=None) -> tuple:
+        """Detected strategies; pass the caller's ``cursor`` to avoid borrowing a second connection."""
+        if self._strategies is None:
+            with self._lock:
+                if self._strategies is None:
+                    if cursor is not None:
+                        self._strategies = self._detect(cursor)
+                    else:
+                        try:
+                            conn = self._connect()
+                        except Exception:
+                            return ("like",)  # pool cạn: lần này dùng LIKE, lần sau dò lại
+                        try:
+                            self._strategies = self._detect(conn.cursor())
+                        finally:
+                            conn.close()
+        return self._strategies
+
+    def _detect(self, cursor) -> tuple:
+        try:
+            cursor.execute(f"SHOW COLUMNS FROM `{self.table}`")
+            columns = {row[0] for row in cursor.fetchall()}
+            cursor.execute(f"SHOW INDEX FROM `{self.table}`")
+            indexes = {(row[2], row[4], row[10]) for row in cursor.fetchall()}  # key, column, type
+        except Exception:
+            return ("like",)
+
+        strategies = []
+        if "title_norm" in columns and any(col == "title_norm" for _, col, _ in indexes):
+            strategies.append("prefix")
+        if any(col == "title" and kind == "FULLTEXT" for _, col, kind in indexes):
+            strategies.append("fulltext")
+        else:
+            strategies.append("like")
+        return tuple(strategies)
+
+    def find(self, cursor, book_title: str, columns: str, limit: int = MAX_RESULTS) -> list:
+        """Rows of ``columns`` whose title matches ``book_title``."""
+        title = book_title.strip()
+        for strategy in self.strategies(cursor):
+            if strategy == "prefix":
+                folded = fold_title(title)
+                if not folded:
+                    continue
+                cursor.execute(
+                    f"SELECT {columns} FROM {self.table} WHERE title_norm LIKE %s ORDER BY title_norm LIMIT %s",
+                    (escape_like(folded) + "%", limit)
+                )
+            elif strategy == "fulltext":
+                phrase = title.replace('"', " ").strip()
+                if len(phrase) < 2:  # ngram_token_size mặc định là 2
+                    continue
+                cursor.execute(
+                    f"SELECT {columns} FROM {self.table} "
+                    f"WHERE MATCH(title) AGAINST (%s IN BOOLEAN MODE) LIMIT %s",
+                    (f'"{phrase}"', limit)
+                )
+            else:
+                cursor.execute(
+                    f"SELECT {columns} FROM {self.table} WHERE title LIKE %s LIMIT %s",
+                    (f"%{escape_like(title)}%", limit)
+                )
+            rows = cursor.fetchall()
+            if rows:
+                return rows
+        return []
+
+    def find_many(self, cursor, book_titles: list, columns: str) -> dict:
+        """First matching row of ``columns`` for each title, ``{title: row}``.
+
+        One query per strategy for the whole batch (titles are OR-ed), so a
+        cart costs one round trip instead of one per title. ``columns`` must
+        start with ``book_id, title``; titles without a match are left out.
+        """
+        pending = {}
+        for title in book_titles:
+            key = fold_title(title)
+            if key:
+                pending.setdefault(key, title.strip())
+        by_key = {}
+        for strategy in self.strategies(cursor):
+            if not pending:
+                break
+            keys = list(pending)
+            if strategy == "prefix":
+                where = " OR ".join(["title_norm LIKE %s"] * len(keys))
+                params = [escape_like(k) + "%" for k in keys]
+            elif strategy == "fulltext":
+                phrases = [pending[k].replace('"', " ").strip() for k in keys]
+                phrases = [p for p in phrases if len(p) >= 2]  # ngram_token_size mặc định là 2
+                if not phrases:
+                    continue
+                # BOOLEAN MODE không có toán tử: khớp bất kỳ cụm nào
+                where = "MATCH(title) AGAINST (%s IN BOOLEAN MODE)"
+                params = [" ".join(f'"{p}"' for p in phrases)]
+            else:
+                where = " OR ".join(["title LIKE %s"] * len(keys))
+                params = [f"%{escape_like(pending[k])}%" for k in keys]
+            cursor.execute(
+                f"SELECT {columns} FROM {self.table} WHERE {where} ORDER BY book_id LIMIT %s",
+                tuple(params) + (MAX_RESULTS * len(keys),)
+            )
+            rows = [(fold_title(row[1]), row) for row in cursor.fetchall()]
+            # Gán lại từng dòng cho tên đã hỏi, cùng quy tắc với strategy
+            for key in keys:
+                for folded, row in rows:
+                    if folded.startswith(key) if strategy == "prefix" else key in folded:
+                        by_key[key] = row
+                        del pending[key]
+                        break
+        return {title: by_key[fold_title(title)] for title in book_titles if fold_title(title) in by_key}
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+
+# Cache embedding cho pipeline huấn luyện: mỗi model một ma trận .npy trên đĩa,
+# mỗi dòng ứng với hash của một câu; lần chạy sau chỉ encode các câu mới
+CACHE_DIR = "model/train_embeddings"
+# Chỉ dùng encode_multi_process khi máy nhiều core và số câu mới đủ lớn
+MULTI_PROCESS_MIN_CPUS = 8
+MULTI_PROCESS_MIN_ROWS = 2000
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest().encode("ascii")
+
+
+def _slug(model_name: str) -> str:
+    return re.sub(r"[^0-9A-Za-z._-]+", "_", model_name)
+
+
+class TrainingEmbeddingStore:
+    """On-disk embedding matrix for one model, keyed by text hash.
+
+    ``<cache_dir>/<model>.npy`` holds the vectors and ``<model>.keys.npy``
+    the sha1 of each row's text. Both are memory-mapped on load; new rows
+    are appended and the files rewritten atomically.
+    """
+
+    def __init__(self, model_name: str, load_model, cache_dir: str = CACHE_DIR):
+        self.model_name = model_name
+        self._load_model = load_model
+        self._model = None
+        base = os.path.join(cache_dir, _slug(model_name))
+        self.matrix_path = base + ".npy"
+        self.keys_path = base + ".keys.npy"
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "encoded": 0}
+
+    @property
+    def model(self):
+        # Chỉ nạp model khi thật sự có câu mới cần encode
+        if self._model is None:
+            self._model = self._load_model()
+        return self._model
+
+    def _open(self) -> tuple:
+        if not (os.path.exists(self.matrix_path) and os.path.exists(self.keys_path)):
+            return None, {}
+        matrix = np.load(self.matrix_path, mmap_mode="r")
+        keys = np.load(self.keys_path)
+        return matrix, {k: i for i, k in enumerate(keys.tolist())}
+
+    def _save(self, matrix: np.ndarray, keys: list) -> None:
+        os.makedirs(os.path.dirname(self.matrix_path) or ".", exist_ok=True)
+        for path, data in ((self.matrix_path, matrix), (self.keys_path, np.array(keys, dtype="S40"))):
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, data)
+            os.replace(tmp, path)
+
+    def _encode_new(self, texts: list, batch_size: int) -> np.ndarray:
+        if (os.cpu_count() or 1) >= MULTI_PROCESS_MIN_CPUS and len(texts) >= MULTI_PROCESS_MIN_ROWS:
+            pool = self.model.start_multi_process_pool()
+            try:
+                return self.model.encode_multi_process(texts, pool, batch_size=batch_size)
+            finally:
+                self.model.stop_multi_process_pool(pool)
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                 show_progress_bar=len(texts) > batch_size)
+
+    def encode(self, texts: list, batch_size: int = 64) -> np.ndarray:
+        """Embeddings for ``texts`` in order, encoding only texts not cached yet."""
+        hashes = [text_hash(t) for t in texts]
+        with self._lock:
+            matrix, index = self._open()
+            missing = {}
+            for h, t in zip(hashes, texts):
+                if h not in index and h not in missing:
+                    missing[h] = t
+            self.stats["hits"] += len(texts) - len(missing)
+
+            if missing:
+                new = np.asarray(self._encode_new(list(missing.values()), batch_size), dtype=np.float32)
+                self.stats["encoded"] += len(missing)
+                keys = list(index) + list(missing)
+                merged = new if matrix is None else np.concatenate([np.asarray(matrix), new])
+                del matrix  # đóng mmap trước khi ghi đè file (Windows)
+                self._save(merged, keys)
+                matrix, index = self._open()
+
+            if matrix is None:
+                return np.zeros((0, 0), dtype=np.float32)
+            return np.asarray(matrix[[index[h] for h in hashes]])